@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Size and query latency of the run archive over years of cron runs.
+
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --years 3 --save-baseline
+
+Fills a fresh archive with --years of synthetic 15-minute runs for one
+location (products change at roughly the real cadence: outlooks a few
+times a day, the forecast hourly, alerts now and then), then reports
+bytes per run, the median cost of archiving a run and of the queries in
+run_archive.py. Compared against benchmarks/baselines/archive.json like
+bench_pipeline.py.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_pipeline import BASELINE_DIR, HOME, regressions
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workflows"))
+
+from gridpoints import point_key  # noqa: E402
+from run_archive import RunArchive  # noqa: E402
+
+RUN_INTERVAL = 15 * 60
+START = 1704067200  # 2024-01-01 UTC
+RISKS = [(None, None), ("Marginal Risk", 3), ("Slight Risk", 4), ("Enhanced", 5), ("Moderate", 6)]
+
+
+def synthetic_summary(run_at, rng, state):
+    hour = int(run_at // 3600)
+    if hour != state.get("hour"):
+        state["hour"] = hour
+        if hour % 6 == 0:
+            for day in ("day1", "day2", "day3"):
+                description, level = rng.choices(RISKS, weights=[70, 12, 10, 6, 2])[0]
+                state[day] = {"description": description, "risk_level": level}
+        if rng.random() < 0.03:
+            alert_id = f"urn:oid:2.49.0.1.840.0.{hour}"
+            state["watches"] = {"Severe Thunderstorm Watch": {
+                "id": alert_id, "onset": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(run_at - 300)),
+                "expires": None, "severity": "Severe", "urgency": "Immediate",
+                "headline": f"Severe Thunderstorm Watch {hour}", "description": "Stub alert text. " * 20,
+            }}
+        elif rng.random() < 0.2:
+            state["watches"] = {}
+        state["forecast"] = {"midnighthigh": {}, "rainalerts": {
+            str(d): {"start_time": f"day {d} at 02AM", "probability": rng.choice([20, 40, 60, 80])}
+            for d in range(hour // 24, hour // 24 + 6)
+        }}
+    sources = {name: {"status": "ok" if rng.random() > 0.01 else "stale", "elapsed": 0.2}
+               for name in ("watches", "mesoscales", "forecast", "day1", "day2", "day3")}
+    return {
+        "metadata": {"latitude": HOME[0], "longitude": HOME[1], "sources": sources},
+        "watches": state.get("watches", {}),
+        "mesoscales": {"summary": "None", "description": None, "probability": "0", "discussions": []},
+        "forecast_data": state["forecast"],
+        "risk": {day: state[day] for day in ("day1", "day2", "day3")},
+    }
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def benchmark(years, repeat, seed=0):
+    path = os.path.join(tempfile.mkdtemp(prefix="grove-bench-archive-"), "archive.sqlite")
+    archive = RunArchive(path)
+    location = point_key(*HOME)
+    rng = random.Random(seed)
+    state = {}
+
+    runs = int(years * 365 * 24 * 3600 / RUN_INTERVAL)
+    record_timings = []
+    for i in range(runs):
+        run_at = START + i * RUN_INTERVAL
+        summary = synthetic_summary(run_at, rng, state)
+        t0 = time.perf_counter()
+        archive.record(location, summary, run_at=run_at)
+        record_timings.append(time.perf_counter() - t0)
+    archive.close()
+
+    season = (START + (runs - 90 * 96) * RUN_INTERVAL, None)
+    queries = {
+        "daily_max_day1_season": lambda: archive.daily_max(location, "day1", *season),
+        "daily_max_day1_all": lambda: archive.daily_max(location, "day1"),
+        "source_health_season": lambda: archive.source_health(location, *season),
+        "alert_latency_season": lambda: archive.alert_latency(location, season[0]),
+        "product_changes_day1_week": lambda: archive.product_changes(
+            location, "day1", START + (runs - 7 * 96) * RUN_INTERVAL),
+    }
+    return {
+        "runs": runs,
+        "bytes_per_run": round(os.path.getsize(path) / runs, 1),
+        "record_ms": round(statistics.median(record_timings) * 1000, 3),
+        "queries": {f"{name}_ms": median_ms(query, repeat) for name, query in queries.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--floor-ms", type=float, default=2.0)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = benchmark(args.years, args.repeat)
+    print(f"  {'runs':<35} {results['runs']}")
+    print(f"  {'bytes_per_run':<35} {results['bytes_per_run']}")
+    print(f"  {'record_ms':<35} {results['record_ms']}")
+    for key, value in results["queries"].items():
+        print(f"  {key:<35} {value}")
+
+    path = os.path.join(BASELINE_DIR, "archive.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"  baseline saved to {os.path.relpath(path)}")
+        return 0
+
+    failed = False
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+        baseline.pop("runs", None)
+        for key, old, new in regressions(results, baseline, args.tolerance, args.floor_ms):
+            failed = True
+            print(f"  REGRESSION {key}: {old} -> {new}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark feed_reader.iter_items against feedparser on recorded SPC MD feeds.
+
+    python benchmarks/bench_feed_reader.py [feed.xml ...] [--repeat N]
+
+Defaults to every spcmdrss*.xml under benchmarks/fixtures. feedparser is
+only needed for the comparison (pip install feedparser).
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "workflows"))
+
+from feed_reader import iter_items  # noqa: E402
+
+_PRE = re.compile(r"<pre>(.*?)</pre>", re.DOTALL)
+
+
+def with_feed_reader(body):
+    return [(item.guid, item.title, item.published, item.pre) for item in iter_items(body)]
+
+
+def with_feedparser(body):
+    import feedparser
+
+    out = []
+    for item in feedparser.parse(body).entries:
+        match = _PRE.search(item.get("description", ""))
+        out.append((item.get("id"), item.get("title"), item.get("published"),
+                    match.group(1) if match else None))
+    return out
+
+
+def measure(func, body, repeat):
+    func(body)  # warm up imports / regex caches
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(body)
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("feeds", nargs="*",
+                        default=sorted(glob.glob(os.path.join(HERE, "fixtures", "spcmdrss*.xml"))))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    readers = [("feed_reader", with_feed_reader)]
+    try:
+        import feedparser  # noqa: F401
+        readers.append(("feedparser", with_feedparser))
+    except ImportError:
+        print("feedparser not installed, only timing feed_reader")
+
+    for path in args.feeds:
+        with open(path, "rb") as f:
+            body = f.read()
+        print(f"{os.path.basename(path)} ({len(body) / 1024:.1f} KiB)")
+
+        results = {}
+        for name, func in readers:
+            median, peak = measure(func, body, args.repeat)
+            results[name] = (median, peak)
+            print(f"  {name:<12} {median * 1000:8.2f} ms   peak {peak / 1024:8.1f} KiB")
+
+        if len(results) == 2:
+            fast, slow = results["feed_reader"], results["feedparser"]
+            print(f"  speedup {slow[0] / fast[0]:.1f}x, memory {slow[1] / max(fast[1], 1):.1f}x less")
+            same = [r[3] for r in with_feed_reader(body)] == [r[3] for r in with_feedparser(body)]
+            print(f"  <pre> blocks identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
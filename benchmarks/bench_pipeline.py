@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+End-to-end and per-function benchmarks against the local stub server.
+
+    python benchmarks/bench_pipeline.py                    # all scenarios
+    python benchmarks/bench_pipeline.py --scenario outbreak --locations 1000
+    python benchmarks/bench_pipeline.py --save-baseline    # refresh baselines
+    python benchmarks/bench_pipeline.py --processes 4      # plus a fanned-out batch
+
+For each scenario this measures the median latency of every fetcher and
+renderer (cold caches and warm caches), a full single-location run, and a
+batch run over --locations points, plus tracemalloc peaks. Results are
+compared with benchmarks/baselines/<scenario>.json and the script exits
+non-zero when anything regressed by more than --tolerance (and, for
+latencies, by more than --floor-ms).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(HERE, "baselines")
+
+# Caches must live somewhere disposable before the pipeline is imported
+os.environ["GROVE_CACHE_DIR"] = tempfile.mkdtemp(prefix="grove-bench-cache-")
+sys.path.insert(0, os.path.join(HERE, "..", "workflows"))
+
+import alert_store  # noqa: E402
+import fanout  # noqa: E402
+import geometry_store  # noqa: E402
+import gridpoints  # noqa: E402
+import http_cache  # noqa: E402
+import http_client  # noqa: E402
+import last_good  # noqa: E402
+import main as fetchers  # noqa: E402
+import md_store  # noqa: E402
+import workflow  # noqa: E402
+from scenarios import available, scenario_dir  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+HOME = (39.02206, -94.8478)
+# Latencies this close to their baseline are timer and scheduler jitter
+# on a loaded runner, whatever the ratio
+FLOOR_MS = 5.0
+
+
+def reset_caches():
+    """Fresh on-disk caches and no in-process indexes: a cold cron start."""
+    directory = tempfile.mkdtemp(prefix="grove-bench-cache-")
+    # Stores that look up their directory when used (risk_grids, publish
+    # state) follow DEFAULT_DIR; the singletons are replaced outright
+    http_cache.DEFAULT_DIR = directory
+    http_cache.set_cache(http_cache.ResponseCache(directory))
+    gridpoints.set_gridpoint_cache(gridpoints.GridpointCache(os.path.join(directory, "gridpoints.json")))
+    md_store.set_md_store(md_store.MesoscaleStore(os.path.join(directory, "mesoscales.json")))
+    geometry_store.set_geometry_store(geometry_store.GeometryStore(os.path.join(directory, "geometries")))
+    last_good.set_last_good_store(last_good.LastGoodStore(os.path.join(directory, "last_good")))
+    alert_store.set_alert_store(alert_store.AlertStore(os.path.join(directory, "alerts.json")))
+    fetchers._product_indexes.clear()
+    fetchers._product_bodies.clear()
+
+
+def median_ms(func, repeat, cold=False):
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            reset_caches()
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def peak_kib(func):
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run_single():
+    summary = workflow.get_weather_summary(*HOME)
+    simple = workflow.simplify_for_complication(summary)
+    workflow.build_complication_json(simple)
+    workflow.build_modular_large_json(simple["four_days_grid"])
+
+
+def fleet(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        {"name": f"loc{i:05d}", "latitude": round(rng.uniform(30, 46), 4),
+         "longitude": round(rng.uniform(-104, -84), 4)}
+        for i in range(count)
+    ]
+
+
+def batch_warm_s(points, processes=None):
+    """A warm batch run including rendering and writing, serial or fanned out."""
+    out_dir = tempfile.mkdtemp(prefix="grove-bench-out-")
+    t0 = time.perf_counter()
+    if processes:
+        fanout.run_batch(points, out_dir, processes, max_age=0)
+    else:
+        workflow.write_batch_outputs(workflow.get_weather_summaries(points), out_dir, max_age=0)
+    return time.perf_counter() - t0
+
+
+def benchmark(scenario, repeat, locations, processes=None):
+    lat, lon = HOME
+    summary = workflow.get_weather_summary(lat, lon)
+    simple = workflow.simplify_for_complication(summary)
+    functions = {
+        "get_watches": lambda: fetchers.get_watches(lat, lon),
+        "get_mesoscales": lambda: fetchers.get_mesoscales(lat, lon),
+        "get_max_risk.day1": lambda: fetchers.get_max_risk(1, lat, lon),
+        "get_max_risk.day2": lambda: fetchers.get_max_risk(2, lat, lon),
+        "get_max_risk.day3": lambda: fetchers.get_max_risk(3, lat, lon),
+        "get_forecast": lambda: fetchers.get_forecast(lat, lon),
+        "simplify_for_complication": lambda: workflow.simplify_for_complication(summary),
+        "build_complication_json": lambda: workflow.build_complication_json(simple),
+        "build_modular_large_json": lambda: workflow.build_modular_large_json(simple["four_days_grid"]),
+    }
+
+    results = {"cold_ms": {}, "warm_ms": {}}
+    for name, func in functions.items():
+        results["cold_ms"][name] = median_ms(func, repeat, cold=True)
+        func()
+        results["warm_ms"][name] = median_ms(func, repeat)
+
+    results["single_cold_ms"] = median_ms(run_single, repeat, cold=True)
+    results["single_warm_ms"] = median_ms(run_single, repeat)
+    reset_caches()
+    results["single_peak_kib"] = peak_kib(run_single)
+
+    if locations:
+        points = fleet(locations)
+        reset_caches()
+        t0 = time.perf_counter()
+        workflow.get_weather_summaries(points)
+        elapsed = time.perf_counter() - t0
+        results[f"batch_{locations}_s"] = round(elapsed, 3)
+        results[f"batch_{locations}_per_s"] = round(locations / elapsed, 1)
+        reset_caches()
+        results[f"batch_{locations}_peak_kib"] = peak_kib(lambda: workflow.get_weather_summaries(points))
+        if processes:
+            # Same warm caches for both, so only the fan-out differs
+            serial = batch_warm_s(points)
+            parallel = batch_warm_s(points, processes)
+            results[f"batch_{locations}_warm_per_s"] = round(locations / serial, 1)
+            results[f"batch_{locations}_p{processes}_per_s"] = round(locations / parallel, 1)
+    return results
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def regressions(results, baseline, tolerance, floor_ms):
+    """
+    Metrics that got worse than baseline by more than tolerance (throughput:
+    lower is worse). Latencies within floor_ms of the baseline are noise.
+    """
+    current = dict(flatten(results))
+    found = []
+    for key, old in flatten(baseline):
+        new = current.get(key)
+        if new is None or not old:
+            continue
+        if "_ms" in key and new - old < floor_ms:
+            continue
+        worse = old / new if key.endswith("_per_s") else new / old
+        if worse > 1 + tolerance:
+            found.append((key, old, new))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", action="append", help=f"one of {available()} (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="also time the batch fanned out over this many processes")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--floor-ms", type=float, default=FLOOR_MS)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.scenario or available():
+        with StubServer(scenario_dir(name)) as stub:
+            previous = http_client.set_client(http_client.HttpClient(rewrite=stub.rewrite))
+            try:
+                results = benchmark(name, args.repeat, args.locations, args.processes)
+            finally:
+                http_client.set_client(previous)
+            results["requests"] = dict(stub.requests)
+
+        print(f"== {name}")
+        for key, value in flatten(results):
+            print(f"  {key:<45} {value}")
+
+        path = os.path.join(BASELINE_DIR, f"{name}.json")
+        if args.save_baseline:
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            print(f"  baseline saved to {os.path.relpath(path)}")
+        elif os.path.exists(path):
+            with open(path) as f:
+                baseline = json.load(f)
+            baseline.pop("requests", None)
+            for key, old, new in regressions(results, baseline, args.tolerance, args.floor_ms):
+                failed = True
+                print(f"  REGRESSION {key}: {old} -> {new}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
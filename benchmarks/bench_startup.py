@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the cron entry point.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --save-baseline
+
+Runs each probe in a fresh interpreter --repeat times and reports its
+median wall time over a bare interpreter's, the -X importtime total for
+`import workflow`, and which heavy dependencies that import drags in
+(they should all load lazily, when the stage that needs them runs).
+Compared against benchmarks/baselines/startup.json like bench_pipeline.py.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_pipeline import BASELINE_DIR, regressions
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKFLOWS = os.path.join(HERE, "..", "workflows")
+HEAVY = ("requests", "urllib3", "numpy", "shapely", "flask")
+
+PROBES = {
+    "import_workflow": ["-c", "import workflow"],
+    "help": ["workflow.py", "--help"],
+}
+
+
+def wall_ms(args, repeat, cwd):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - t0)
+    return round(statistics.median(timings) * 1000, 1)
+
+
+def import_profile(cwd):
+    """(cumulative import microseconds of workflow, heavy modules it loaded)"""
+    probe = f"import sys, workflow; print([m for m in {HEAVY!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=cwd,
+                            check=True, capture_output=True, text=True)
+    cumulative = re.search(r"\|\s*(\d+)\s*\|\s*workflow$", result.stderr, re.MULTILINE)
+    return int(cumulative.group(1)), json.loads(result.stdout.strip().replace("'", '"'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--floor-ms", type=float, default=10.0)
+    parser.add_argument("--workflows-dir", default=WORKFLOWS, help="tree to measure")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    interpreter = wall_ms(["-c", "pass"], args.repeat, args.workflows_dir)
+    results = {
+        f"{name}_ms": round(wall_ms(probe, args.repeat, args.workflows_dir) - interpreter, 1)
+        for name, probe in PROBES.items()
+    }
+    import_us, heavy = import_profile(args.workflows_dir)
+    results["import_workflow_importtime_ms"] = round(import_us / 1000, 1)
+
+    print(f"  {'interpreter_ms':<35} {interpreter}")
+    for key, value in results.items():
+        print(f"  {key:<35} {value}")
+    print(f"  {'heavy modules on import':<35} {', '.join(heavy) or 'none'}")
+
+    path = os.path.join(BASELINE_DIR, "startup.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"  baseline saved to {os.path.relpath(path)}")
+        return 0
+
+    failed = bool(heavy)
+    if heavy:
+        print(f"  REGRESSION import workflow loads {', '.join(heavy)}")
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+        for key, old, new in regressions(results, baseline, args.tolerance, args.floor_ms):
+            failed = True
+            print(f"  REGRESSION {key}: {old} -> {new}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Check that a cold process fetches every source cleanly on the first try.
+
+    python benchmarks/check_cold_imports.py
+    python benchmarks/check_cold_imports.py --runs 100 --scenario quiet
+
+Starts the stub server, then runs get_weather_summary --runs times, each
+in a fresh interpreter where numpy, shapely and the parsers are not yet
+loaded. The six sources are fetched concurrently by fetch_sources, so a
+lazy import racing across fetch threads shows up as a failed source.
+Every run fetches twice, since such a race can leave the process broken
+for good. Any source that isn't "ok" is printed and the script exits
+non-zero.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from scenarios import scenario_dir
+from stub_server import StubServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKFLOWS = os.path.join(HERE, "..", "workflows")
+HOME = (39.02206, -94.8478)
+
+CHILD = """
+import json, sys
+import http_client, workflow
+http_client.set_client(http_client.HttpClient(rewrite=json.loads(sys.argv[1])))
+runs = []
+for _ in range(2):
+    summary = workflow.get_weather_summary({lat}, {lon})
+    runs.append({{name: info.get("error", info["status"]) for name, info in summary["metadata"]["sources"].items()}})
+print(json.dumps(runs))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--scenario", default="outbreak")
+    args = parser.parse_args()
+
+    child = CHILD.format(lat=HOME[0], lon=HOME[1])
+    failed = 0
+    with StubServer(scenario_dir(args.scenario)) as stub:
+        for run in range(args.runs):
+            # Fresh caches too, so every run parses the products itself
+            env = dict(os.environ, GROVE_CACHE_DIR=tempfile.mkdtemp(prefix="grove-check-imports-"))
+            result = subprocess.run([sys.executable, "-c", child, json.dumps(stub.rewrite)],
+                                    cwd=WORKFLOWS, env=env, capture_output=True, text=True)
+            try:
+                fetches = json.loads(result.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                fetches = None
+            bad = None if fetches is None else [
+                (i, name, status) for i, sources in enumerate(fetches)
+                for name, status in sources.items() if status != "ok"
+            ]
+            if fetches is None:
+                failed += 1
+                print(f"  run {run} crashed: {(result.stderr.strip().splitlines() or ['no output'])[-1]}")
+            elif bad:
+                failed += 1
+                print(f"  run {run}: {bad}")
+
+    print(f"  {args.runs} cold runs, {failed} with failed sources")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Check forecast.HourlyColumns against the original per-location get_forecast.
+
+    python benchmarks/check_forecast_columns.py
+    python benchmarks/check_forecast_columns.py --trials 2000 --seed 7
+
+reference_forecast below is get_forecast's loop from before the columnar
+rewrite, taking periods and "now" as arguments. The only deliberate
+difference is kept out of the comparison: a missing PoP used to raise and
+now counts as 0, so the reference reads it as 0 too.
+
+Each trial builds random NWS hourly period lists for a batch of
+locations: any start hour, UTC offsets that change mid-series like a DST
+switch, tied daily highs, PoPs right at RAIN_ALERT_POP, missing PoPs,
+and empty or single-day forecasts. The batch is reduced in one
+HourlyColumns pass and each location is compared with the reference. Any
+difference is printed and the script exits non-zero.
+"""
+
+import argparse
+import os
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workflows"))
+
+from forecast import RAIN_ALERT_POP, HourlyColumns  # noqa: E402
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def reference_forecast(periods, now):
+    forecast_data = {
+        "midnighthigh": {},
+        "rainalerts": {}
+    }
+
+    periods_by_date = defaultdict(list)
+    for period in periods:
+        date = period['startTime'].split('T')[0]
+        periods_by_date[date].append(period)
+
+    sorted_dates = sorted(periods_by_date.keys())[:-1]
+
+    for date in sorted_dates:
+        daily_periods = periods_by_date[date]
+        max_temp_period = max(daily_periods, key=lambda p: p['temperature'])
+        max_temp = max_temp_period['temperature']
+        max_temp_hour = datetime.strptime(max_temp_period['startTime'], "%Y-%m-%dT%H:%M:%S%z").hour
+
+        temp_5pm = next((p['temperature'] for p in daily_periods
+                         if datetime.strptime(p['startTime'], "%Y-%m-%dT%H:%M:%S%z").hour == 17), None)
+
+        if max_temp_hour < 12:
+            forecast_data["midnighthigh"][date] = {
+                "daily_high": max_temp,
+                "hour_of_daily_high": max_temp_hour,
+                "afternoon_high": temp_5pm
+            }
+
+    for period in periods:
+        start_time = datetime.strptime(period['startTime'], "%Y-%m-%dT%H:%M:%S%z")
+
+        if start_time.timestamp() > now:
+            start_date = start_time.date().isoformat()
+            probability = (period.get('probabilityOfPrecipitation') or {}).get('value') or 0
+
+            if probability > RAIN_ALERT_POP:
+                if start_date not in forecast_data["rainalerts"]:
+                    forecast_data["rainalerts"][start_date] = {
+                        'start_time': start_time.strftime("%A %m/%d at %I%p"),
+                        'probability': probability
+                    }
+
+    return forecast_data
+
+
+def random_periods(rng):
+    """One location's hourly periods, in order, as the NWS API returns them."""
+    hours = rng.choice([0, 1, rng.randint(2, 30), rng.randint(24, 160)])
+    first = START + timedelta(days=rng.randint(0, 300), hours=rng.randint(0, 23))
+    offsets = [rng.choice([-4, -5, -6, -7, -10])]
+    switch = rng.randint(0, max(hours, 1)) if rng.random() < 0.3 else None
+    if switch is not None:
+        offsets.append(offsets[0] + rng.choice([-1, 1]))
+
+    periods = []
+    base = rng.randint(20, 90)
+    for h in range(hours):
+        zone = timezone(timedelta(hours=offsets[1] if switch is not None and h >= switch else offsets[0]))
+        start = (first + timedelta(hours=h)).astimezone(zone)
+        period = {
+            "startTime": start.isoformat(),
+            # Coarse values so daily highs tie often
+            "temperature": base + rng.choice([-6, -3, 0, 0, 3, 6]) + (5 if 3 <= start.hour <= 8 else 0),
+        }
+        pop = rng.choice([None, 0, 10, RAIN_ALERT_POP, RAIN_ALERT_POP + 1, 60, 100, "missing"])
+        if pop != "missing":
+            period["probabilityOfPrecipitation"] = {"unitCode": "wmoUnit:percent", "value": pop}
+        periods.append(period)
+    return periods
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=500)
+    parser.add_argument("--locations", type=int, default=8, help="locations per HourlyColumns batch")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    for trial in range(args.trials):
+        batch = [random_periods(rng) for _ in range(rng.randint(1, args.locations))]
+        periods = [p for location in batch for p in location]
+        if periods:
+            now = rng.choice(periods)["startTime"]
+            now = datetime.fromisoformat(now).timestamp() + rng.choice([-1, 0, 1])
+        else:
+            now = START.timestamp()
+
+        columnar = HourlyColumns.from_periods(batch).forecast_data(now)
+        for i, location in enumerate(batch):
+            expected = reference_forecast(location, now)
+            if columnar[i] != expected:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"  trial {trial} location {i} ({len(location)} periods, now={now}):")
+                    print(f"    reference {expected}")
+                    print(f"    columnar  {columnar[i]}")
+
+    print(f"  {args.trials} trials, {mismatches} mismatching locations")
+    if mismatches:
+        print("  FAILED: HourlyColumns differs from the per-location reference")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
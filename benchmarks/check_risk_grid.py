@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Check that risk_grid answers exactly like the STRtree indexes it stands in for.
+
+    python benchmarks/check_risk_grid.py
+    python benchmarks/check_risk_grid.py --points 500000 --seeds 5
+
+For every scenario outlook and MD feed, and for synthetic products built
+to hit the grid's corner cases (nested DNs, self-intersecting and
+overlapping-part polygons, polygons running off the grid, more than
+MAX_MASK_BITS MDs and more than MAX_SETS distinct covering sets), random
+points, points jittered around every polygon edge and points on cell
+corners are looked up through GriddedOutlook / GriddedMesoscales and
+through spatial.OutlookIndex / MesoscaleIndex. Any difference is printed
+and the script exits non-zero.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.environ["GROVE_CACHE_DIR"] = tempfile.mkdtemp(prefix="grove-check-grid-")
+sys.path.insert(0, os.path.join(HERE, "..", "workflows"))
+
+import numpy as np  # noqa: E402
+import shapely  # noqa: E402
+from shapely.geometry import MultiPolygon, Polygon  # noqa: E402
+
+import main as fetchers  # noqa: E402
+import md_store  # noqa: E402
+import risk_grid  # noqa: E402
+from risk_grid import BOUNDS, CELL, GriddedMesoscales, GriddedOutlook, RiskGrid  # noqa: E402
+from scenarios import available, scenario_dir  # noqa: E402
+from spatial import MesoscaleIndex, OutlookIndex  # noqa: E402
+
+OUTLOOK_DNS = [2, 3, 4, 5, 6, 8]
+MARGIN = 3.0  # degrees of off-grid space sampled around BOUNDS
+
+
+def random_blob(rng, center, radius, vertices=12):
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    radii = radius * rng.uniform(0.5, 1.0, vertices)
+    return Polygon(np.column_stack((center[0] + radii * np.cos(angles),
+                                    center[1] + radii * np.sin(angles))))
+
+
+def synthetic_outlook(rng):
+    """(DN, geometry) features in the shapes real outlooks (and bad ones) take."""
+    features = []
+    # Nested risk areas, each DN inside the one below it
+    for _ in range(4):
+        center = rng.uniform((BOUNDS[0], BOUNDS[1]), (BOUNDS[2], BOUNDS[3]))
+        shape = random_blob(rng, center, rng.uniform(3, 8))
+        for dn in OUTLOOK_DNS[:rng.integers(2, len(OUTLOOK_DNS) + 1)]:
+            features.append((dn, shape))
+            shape = shape.buffer(-rng.uniform(0.3, 1.0))
+            if shape.is_empty:
+                break
+    # Self-intersecting bow tie
+    x, y = rng.uniform((BOUNDS[0] + 5, BOUNDS[1] + 5), (BOUNDS[2] - 5, BOUNDS[3] - 5))
+    features.append((5, Polygon([(x, y), (x + 3, y + 2), (x + 3, y), (x, y + 2)])))
+    # Multipolygon whose parts overlap
+    x, y = rng.uniform((BOUNDS[0] + 5, BOUNDS[1] + 5), (BOUNDS[2] - 5, BOUNDS[3] - 5))
+    features.append((6, MultiPolygon([
+        Polygon([(x, y), (x + 2, y), (x + 2, y + 2), (x, y + 2)]),
+        Polygon([(x + 1, y + 1), (x + 3, y + 1), (x + 3, y + 3), (x + 1, y + 3)]),
+    ])))
+    # Hanging off the grid, and a hole in a higher risk
+    features.append((3, random_blob(rng, (BOUNDS[0], BOUNDS[3]), 4)))
+    outer = random_blob(rng, rng.uniform((BOUNDS[0] + 6, BOUNDS[1] + 6), (BOUNDS[2] - 6, BOUNDS[3] - 6)), 4)
+    features.append((8, outer.difference(outer.centroid.buffer(1.0))))
+    return features
+
+
+def synthetic_mesoscales(rng, count):
+    """count overlapping MD polygons clustered enough to form many covering sets."""
+    center = rng.uniform((BOUNDS[0] + 10, BOUNDS[1] + 6), (BOUNDS[2] - 10, BOUNDS[3] - 6))
+    return [
+        {"number": str(i), "polygon": random_blob(rng, center + rng.normal(0, 2.5, 2), rng.uniform(1, 3), 8)}
+        for i in range(count)
+    ]
+
+
+def query_points(rng, geometries, count):
+    """Uniform points, points within a cell of every edge and cell corners."""
+    lons = [rng.uniform(BOUNDS[0] - MARGIN, BOUNDS[2] + MARGIN, count)]
+    lats = [rng.uniform(BOUNDS[1] - MARGIN, BOUNDS[3] + MARGIN, count)]
+    for geometry in geometries:
+        boundary = shapely.get_coordinates(shapely.segmentize(geometry.boundary, CELL / 2))
+        lons.append(boundary[:, 0] + rng.uniform(-CELL, CELL, len(boundary)))
+        lats.append(boundary[:, 1] + rng.uniform(-CELL, CELL, len(boundary)))
+    corners = rng.integers(0, (risk_grid.COLUMNS, risk_grid.ROWS), (count // 10, 2))
+    lons.append(BOUNDS[0] + corners[:, 0] * CELL)
+    lats.append(BOUNDS[1] + corners[:, 1] * CELL)
+    return np.concatenate(lons), np.concatenate(lats)
+
+
+def compare(name, expected, actual, lons, lats):
+    """Prints up to five mismatches; returns how many there were."""
+    bad = [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+    status = "ok" if not bad else f"{len(bad)} MISMATCHES"
+    print(f"  {name:<40} {len(lons):>9} points  {status}")
+    for i in bad[:5]:
+        print(f"    ({lons[i]:.5f}, {lats[i]:.5f}): index {expected[i]!r}, grid {actual[i]!r}")
+    return len(bad)
+
+
+def check_outlook(name, index, rng, points):
+    grid = RiskGrid.for_outlook(index)
+    lons, lats = query_points(rng, index.geometries, points)
+    gridded = GriddedOutlook(grid, lambda lo, la: index)
+    return compare(name, index.max_dn_many(lons, lats).tolist(), gridded.max_dn_many(lons, lats).tolist(),
+                   lons, lats)
+
+
+def check_mesoscales(name, index, rng, points):
+    """(mismatches, whether the grid ran out of set labels)."""
+    grid = RiskGrid.for_mesoscales(index)
+    lons, lats = query_points(rng, index.geometries, points)
+    gridded = GriddedMesoscales(grid, index)
+    found = compare(name, index.covering_many(lons, lats), gridded.covering_many(lons, lats), lons, lats)
+    return found, len(grid.table) > risk_grid.MAX_SETS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=200_000, help="uniform points per product")
+    parser.add_argument("--seeds", type=int, default=3, help="synthetic products of each kind")
+    args = parser.parse_args()
+    md_store.set_md_store(md_store.MesoscaleStore(os.path.join(os.environ["GROVE_CACHE_DIR"], "mesoscales.json")))
+
+    mismatches = 0
+    rng = np.random.default_rng(0)
+    for scenario in available():
+        directory = scenario_dir(scenario)
+        for day in (1, 2, 3):
+            path = os.path.join(directory, f"outlook_day{day}.geojson")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    index = fetchers.parse_outlook(f.read())
+                mismatches += check_outlook(f"{scenario} day{day}", index, rng, args.points)
+        path = os.path.join(directory, "spcmdrss.xml")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                index = fetchers.build_mesoscale_index(f.read())
+            mismatches += check_mesoscales(f"{scenario} mesoscales", index, rng, args.points)[0]
+
+    overflowed = False
+    for seed in range(args.seeds):
+        rng = np.random.default_rng(seed)
+        index = OutlookIndex(synthetic_outlook(rng))
+        mismatches += check_outlook(f"synthetic outlook {seed}", index, rng, args.points)
+
+        index = MesoscaleIndex(synthetic_mesoscales(rng, risk_grid.MAX_MASK_BITS + 16))
+        found, full = check_mesoscales(f"synthetic mesoscales {seed} ({len(index)} MDs)", index, rng, args.points)
+        mismatches += found
+        overflowed |= full
+
+    if not overflowed:
+        print(f"  FAILED: no synthetic MD grid used up its {risk_grid.MAX_SETS} set labels; raise --seeds")
+        return 1
+    if mismatches:
+        print(f"  FAILED: {mismatches} points differ between the grid and the index")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Drive many simulated locations through the pipeline against a replay archive.
+
+    python benchmarks/load_generator.py --scenario outbreak --locations 2000 \\
+        --clients 1,8,32 --latency 0.15 --jitter 0.1 --error-rate 0.02
+    python benchmarks/load_generator.py --archive run.grove --ttl forecast=1800
+
+Upstream responses come from workflows/http_archive.ReplayClient, either
+an archive captured with `workflow.py --record` or one recorded here from
+a stub-server scenario. Nothing is sent to api.weather.gov.
+
+Each --clients value is one run: that many concurrent clients request
+summaries for --locations points (per-location get_weather_summary, or
+one get_weather_summaries call with --mode batch). The report shows
+throughput, latency percentiles, upstream requests, injected failures,
+degraded sources and cache hit rates, for sizing worker pools and TTLs.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_pipeline import HOME, fleet, reset_caches  # sets up sys.path and cache dir
+
+import http_cache  # noqa: E402
+import http_client  # noqa: E402
+import metrics  # noqa: E402
+import workflow  # noqa: E402
+from http_archive import HttpArchive, RecordingClient, ReplayClient  # noqa: E402
+from scenarios import scenario_dir  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+
+def record_scenario(name, locations):
+    """Records a stub-server scenario (one batch run plus a single run) into an archive."""
+    archive = HttpArchive(os.path.join(tempfile.mkdtemp(prefix="grove-load-"), f"{name}.grove"))
+    with StubServer(scenario_dir(name)) as stub:
+        client = RecordingClient(archive, rewrite=stub.rewrite)
+        previous = http_client.set_client(client)
+        try:
+            reset_caches()
+            workflow.get_weather_summary(*HOME)
+            workflow.get_weather_summaries(locations[:10])
+        finally:
+            http_client.set_client(previous)
+            client.close()
+    return archive
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(archive, locations, clients, mode, latency, jitter, error_rate, seed):
+    reset_caches()
+    metrics.get_metrics().reset()
+    client = ReplayClient(archive, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+    previous = http_client.set_client(client)
+    degraded = Counter()
+    timings = []
+
+    def one(location):
+        t0 = time.perf_counter()
+        summary = workflow.get_weather_summary(location["latitude"], location["longitude"])
+        timings.append(time.perf_counter() - t0)
+        for source, info in summary["metadata"]["sources"].items():
+            if info["status"] != "ok":
+                degraded[f"{source}.{info['status']}"] += 1
+
+    t0 = time.perf_counter()
+    try:
+        if mode == "batch":
+            workflow.get_weather_summaries(locations, max_workers=clients)
+        else:
+            with ThreadPoolExecutor(max_workers=clients) as pool:
+                list(pool.map(one, locations))
+    finally:
+        http_client.set_client(previous)
+    elapsed = time.perf_counter() - t0
+
+    stages = metrics.get_metrics().snapshot().values()
+    hits = sum(s["cache_hit"] + s["cache_revalidated"] for s in stages)
+    lookups = hits + sum(s["cache_miss"] for s in stages)
+    report = {
+        "seconds": round(elapsed, 2),
+        "locations_per_s": round(len(locations) / elapsed, 1),
+        "upstream_requests": client.requests,
+        "injected_failures": client.failures,
+        "cache_hit_rate": round(hits / lookups, 3) if lookups else None,
+    }
+    if timings:
+        report.update({
+            "p50_ms": round(statistics.median(timings) * 1000, 1),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 1),
+        })
+    report["degraded"] = dict(degraded)
+    return report
+
+
+def parse_ttls(values):
+    ttls = {}
+    for value in values:
+        source, _, seconds = value.partition("=")
+        if source not in http_cache.CACHE_TTLS:
+            raise SystemExit(f"--ttl: unknown source {source!r} (one of {sorted(http_cache.CACHE_TTLS)})")
+        ttls[source] = int(seconds)
+    return ttls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--archive", help="replay archive from workflow.py --record")
+    source.add_argument("--scenario", default="outbreak", help="stub scenario to record and replay")
+    parser.add_argument("--locations", type=int, default=2000)
+    parser.add_argument("--clients", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--mode", choices=("single", "batch"), default="single")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per upstream response")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--ttl", action="append", default=[], metavar="SOURCE=SECONDS",
+                        help="override http_cache.CACHE_TTLS for the run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    http_cache.CACHE_TTLS.update(parse_ttls(args.ttl))
+    locations = fleet(args.locations, seed=args.seed)
+    archive = HttpArchive.load(args.archive) if args.archive else record_scenario(args.scenario, locations)
+    print(f"archive: {len(archive.entries)} urls, {len(archive.bodies)} bodies; "
+          f"ttls: {http_cache.CACHE_TTLS}")
+
+    for clients in (int(c) for c in args.clients.split(",")):
+        report = run(archive, locations, clients, args.mode,
+                     args.latency, args.jitter, args.error_rate, args.seed)
+        print(f"== {args.mode}, {clients} clients, {len(locations)} locations")
+        for key, value in report.items():
+            print(f"  {key:<20} {value}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
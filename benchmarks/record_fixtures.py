@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Capture live NWS/SPC responses into a benchmark scenario.
+
+    python benchmarks/record_fixtures.py outbreak-2026-05-06 --lat 39.02 --lon -94.85
+
+Writes benchmarks/fixtures/scenarios/<name>/ in the layout stub_server.py
+serves, so the same day can be replayed later with
+    python benchmarks/bench_pipeline.py --scenario <name>
+"""
+
+import argparse
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "workflows"))
+
+import http_client  # noqa: E402
+from main import OUTLOOK_URLS, MD_FEED_URL  # noqa: E402
+from scenarios import RECORDED_DIR  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("name")
+    parser.add_argument("--lat", type=float, default=39.02206)
+    parser.add_argument("--lon", type=float, default=-94.8478)
+    args = parser.parse_args()
+
+    directory = os.path.join(RECORDED_DIR, args.name)
+    os.makedirs(directory, exist_ok=True)
+
+    point = f"{round(args.lat, 4)},{round(args.lon, 4)}"
+    points = http_client.get_json(f"https://api.weather.gov/points/{point}")
+    captures = {
+        "outlook_day1.geojson": OUTLOOK_URLS[1],
+        "outlook_day2.geojson": OUTLOOK_URLS[2],
+        "outlook_day3.geojson": OUTLOOK_URLS[3],
+        "spcmdrss.xml": MD_FEED_URL,
+        "alerts.json": f"https://api.weather.gov/alerts?active=true&point={point}",
+        "forecast_hourly.json": points["properties"]["forecastHourly"],
+    }
+
+    with open(os.path.join(directory, "points.json"), "w") as f:
+        json.dump(points, f)
+    for filename, url in captures.items():
+        body = http_client.get_content(url)
+        with open(os.path.join(directory, filename), "wb") as f:
+            f.write(body)
+        print(f"{filename:<24} {len(body) / 1024:8.1f} KiB  {url}")
+
+
+if __name__ == "__main__":
+    main()
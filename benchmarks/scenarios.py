@@ -0,0 +1,182 @@
+"""
+Benchmark scenarios for the stub server.
+
+A scenario is a directory of upstream responses (see stub_server.py).
+Captured scenarios live in benchmarks/fixtures/scenarios/<name> (see
+record_fixtures.py). When a name has no captured directory, a
+deterministic synthetic one is generated instead:
+
+    quiet     general thunder only, no MDs, no alerts
+    outbreak  large nested day 1-3 outlooks (thousands of vertices),
+              15 MDs and 250 alerts across the central US
+"""
+
+import json
+import math
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from xml.sax.saxutils import escape
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RECORDED_DIR = os.path.join(HERE, "fixtures", "scenarios")
+SYNTHETIC = ("quiet", "outbreak")
+
+CENTER = (-95.0, 38.0)  # lon, lat the synthetic outbreak is centred on
+
+
+def _blob(rng, cx, cy, radius, vertices):
+    """A closed, wavy ring around (cx, cy)."""
+    phase = rng.uniform(0, math.tau)
+    ring = []
+    for i in range(vertices):
+        a = math.tau * i / vertices
+        r = radius * (1 + 0.15 * math.sin(5 * a + phase) + 0.05 * math.sin(23 * a))
+        ring.append([round(cx + 1.3 * r * math.cos(a), 4), round(cy + r * math.sin(a), 4)])
+    ring.append(ring[0])
+    return ring
+
+
+def _outlook(rng, levels, vertices, scale):
+    features = []
+    for rank, dn in enumerate(levels):
+        radius = scale * (len(levels) - rank) / len(levels)
+        polygons = [[_blob(rng, CENTER[0], CENTER[1], radius, vertices)]]
+        # Outer categories also get detached pieces
+        for _ in range(max(0, 3 - rank)):
+            cx = CENTER[0] + rng.uniform(-14, 14)
+            cy = CENTER[1] + rng.uniform(-8, 8)
+            polygons.append([_blob(rng, cx, cy, radius / 4, vertices // 4)])
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+            "properties": {"DN": dn, "LABEL": str(dn), "VALID": "202605061300",
+                           "EXPIRE": "202605071200", "ISSUE": "202605061256"},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _md_feed(rng, count):
+    items = []
+    for k in range(count):
+        number = 600 + k
+        cx = CENTER[0] + rng.uniform(-8, 8)
+        cy = CENTER[1] + rng.uniform(-5, 5)
+        ring = _blob(rng, cx, cy, rng.uniform(0.8, 1.6), rng.randint(6, 14))
+        coords = " ".join(f"{int(round(lat * 100)):04d}{int(round(-lon * 100)) % 10000:04d}"
+                          for lon, lat in ring)
+        prob = rng.choice([20, 40, 60, 80, 95])
+        pre = (f"\n   Mesoscale Discussion {number:04d}\n   NWS Storm Prediction Center Norman OK\n\n"
+               f"   Probability of Watch Issuance...{prob} percent\n\n"
+               f"   SUMMARY...Severe storms are expected to develop this afternoon.\n\n"
+               f"   DISCUSSION...Strong instability and shear support supercells.\n\n"
+               f"   LAT...LON   {coords}\n")
+        link = f"https://www.spc.noaa.gov/products/md/md{number:04d}.html"
+        items.append(
+            f"<item><title>SPC MD {number}</title><link>{link}</link>"
+            f"<description>{escape('<pre>' + pre + '</pre>')}</description>"
+            f"<pubDate>Wed, 06 May 2026 18:{k:02d}:00 +0000</pubDate><guid>{link}</guid></item>"
+        )
+    return ('<?xml version="1.0" encoding="ISO-8859-1"?><rss version="2.0"><channel>'
+            "<title>SPC Mesoscale Discussions</title><link>https://www.spc.noaa.gov/</link>"
+            "<description>SPC MDs</description>" + "".join(items) + "</channel></rss>")
+
+
+def _alerts(rng, count):
+    events = [("Tornado Watch", "Severe"), ("Severe Thunderstorm Watch", "Severe"),
+              ("Tornado Warning", "Extreme"), ("Severe Thunderstorm Warning", "Severe"),
+              ("Flood Watch", "Moderate"), ("Heat Advisory", "Minor")]
+    now = datetime(2026, 5, 6, 18, 0, tzinfo=timezone.utc)
+    features = []
+    for i in range(count):
+        event, severity = rng.choice(events)
+        cx = CENTER[0] + rng.uniform(-10, 10)
+        cy = CENTER[1] + rng.uniform(-6, 6)
+        zones = [f"KSZ{rng.randint(1, 110):03d}" for _ in range(rng.randint(1, 6))]
+        alert_id = f"urn:oid:2.49.0.1.840.0.stub.{i:05d}"
+        # Like the real feed, only warnings carry a polygon; the rest are by zone
+        polygon = {"type": "Polygon", "coordinates": [_blob(rng, cx, cy, 0.4, 8)]}
+        features.append({
+            "id": f"https://api.weather.gov/alerts/{alert_id}",
+            "type": "Feature",
+            "geometry": polygon if event.endswith("Warning") else None,
+            "properties": {
+                "id": alert_id, "event": event, "severity": severity, "urgency": "Immediate",
+                "onset": now.isoformat(), "expires": (now + timedelta(hours=4)).isoformat(),
+                "headline": f"{event} issued for stub county {i}",
+                "description": "Stub alert text. " * 20,
+                "affectedZones": [f"https://api.weather.gov/zones/forecast/{z}" for z in zones],
+                "geocode": {"UGC": zones},
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _forecast(rng, start, hours, wet):
+    periods = []
+    for i in range(hours):
+        t = start + timedelta(hours=i)
+        temperature = round(70 + 12 * math.sin((t.hour - 9) / 24 * math.tau) + rng.uniform(-2, 2))
+        pop = rng.choice([0, 5, 10, 20, 40, 60, 80]) if wet else rng.choice([0, 0, 5, 10])
+        periods.append({
+            "number": i + 1, "startTime": t.isoformat(),
+            "endTime": (t + timedelta(hours=1)).isoformat(), "isDaytime": 6 <= t.hour < 18,
+            "temperature": temperature, "temperatureUnit": "F",
+            "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": pop},
+            "windSpeed": "10 mph", "windDirection": "S", "shortForecast": "Mostly Sunny",
+        })
+    return {"type": "Feature", "properties": {"units": "us", "periods": periods}}
+
+
+def generate(name, directory):
+    """Writes the synthetic scenario name into directory."""
+    rng = random.Random(name)
+    os.makedirs(directory, exist_ok=True)
+    outbreak = name == "outbreak"
+
+    if outbreak:
+        outlooks = {1: _outlook(rng, [2, 3, 4, 5, 6, 8], 2500, 14),
+                    2: _outlook(rng, [2, 3, 4, 5], 1200, 12),
+                    3: _outlook(rng, [2, 3, 4], 600, 10)}
+    else:
+        outlooks = {1: _outlook(rng, [2], 200, 4),
+                    2: {"type": "FeatureCollection", "features": []},
+                    3: {"type": "FeatureCollection", "features": []}}
+
+    central = timezone(timedelta(hours=-5))
+    start = datetime.now(central).replace(minute=0, second=0, microsecond=0)
+    files = {
+        "outlook_day1.geojson": json.dumps(outlooks[1]),
+        "outlook_day2.geojson": json.dumps(outlooks[2]),
+        "outlook_day3.geojson": json.dumps(outlooks[3]),
+        "spcmdrss.xml": _md_feed(rng, 15 if outbreak else 0),
+        "alerts.json": json.dumps(_alerts(rng, 250 if outbreak else 0)),
+        "points.json": json.dumps({"properties": {
+            "cwa": "EAX", "gridId": "EAX",
+            "forecastZone": "https://api.weather.gov/zones/forecast/KSZ105",
+            "county": "https://api.weather.gov/zones/county/KSC091",
+            "fireWeatherZone": "https://api.weather.gov/zones/fire/KSZ105",
+        }}),
+        "forecast_hourly.json": json.dumps(_forecast(rng, start, 156, outbreak)),
+    }
+    for filename, content in files.items():
+        with open(os.path.join(directory, filename), "w") as f:
+            f.write(content)
+    return directory
+
+
+def scenario_dir(name):
+    """Captured scenario directory if there is one, else a freshly generated one."""
+    recorded = os.path.join(RECORDED_DIR, name)
+    if os.path.isdir(recorded):
+        return recorded
+    if name not in SYNTHETIC:
+        raise ValueError(f"unknown scenario {name!r}: not in {RECORDED_DIR} and not one of {SYNTHETIC}")
+    return generate(name, tempfile.mkdtemp(prefix=f"grove-{name}-"))
+
+
+def available():
+    recorded = sorted(os.listdir(RECORDED_DIR)) if os.path.isdir(RECORDED_DIR) else []
+    return list(dict.fromkeys(recorded + list(SYNTHETIC)))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Replay recorded days through the daemon's refresh schedule.
+
+    python benchmarks/simulate_polling.py [day.jsonl ...] [--budget N]
+
+Each line of a day file is the state from that time on:
+    {"time": "2026-05-06T18:55:00Z", "severity": "Severe",
+     "mesoscale_active": true, "day1_risk": 6}
+
+For every day the adaptive policy is compared against the 15 minute cron
+(7 requests per run) on total requests and on how long a change in
+watch severity or MD status went unnoticed.
+"""
+
+import argparse
+import bisect
+import glob
+import json
+import os
+import statistics
+import sys
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "workflows"))
+
+from scheduler import RefreshSchedule, AdaptivePolicy, REQUEST_BUDGET, last_issuance  # noqa: E402
+
+CRON_INTERVAL = 15 * 60
+CRON_REQUESTS = 7  # alerts, MD feed, /points, hourly forecast, 3 outlooks
+DAY = 24 * 3600
+
+# Which product reveals which part of the recorded state
+REVEALS = {"watches": "severity", "mesoscales": "mesoscale_active", "day1": "day1_risk"}
+
+
+def load_day(path):
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for record in records:
+        record["t"] = datetime.fromisoformat(record.pop("time").replace("Z", "+00:00")).timestamp()
+    return sorted(records, key=lambda r: r["t"])
+
+
+def state_at(records, times, t):
+    return records[max(0, bisect.bisect_right(times, t) - 1)]
+
+
+def changes(records, field):
+    return [r["t"] for prev, r in zip(records, records[1:]) if r[field] != prev[field]]
+
+
+def detection_latency(change_times, poll_times):
+    latencies = []
+    for t in change_times:
+        i = bisect.bisect_left(poll_times, t)
+        if i < len(poll_times):
+            latencies.append(poll_times[i] - t)
+    return latencies
+
+
+def simulate_cron(records):
+    start = records[0]["t"]
+    polls = [start + i * CRON_INTERVAL for i in range(DAY // CRON_INTERVAL)]
+    return len(polls) * CRON_REQUESTS, {field: polls for field in ("severity", "mesoscale_active")}
+
+
+def simulate_adaptive(records, budget):
+    times = [r["t"] for r in records]
+    start, end = records[0]["t"], records[0]["t"] + DAY
+    schedule = RefreshSchedule(policy=AdaptivePolicy(budget=budget))
+    known = {"severity": None, "mesoscale_active": False, "day1_risk": None}
+    polls = {"severity": [], "mesoscale_active": []}
+    seen_issuance = {}
+    requests = 0
+
+    now = start
+    while now < end:
+        for product in schedule.due(now):
+            requests += 1
+            state = state_at(records, times, now)
+            field = REVEALS.get(product)
+            if field:
+                known[field] = state[field]
+                polls.get(field, []).append(now)
+
+            changed = False
+            if product in ("day1", "day2", "day3"):
+                # A poll after an issuance we haven't seen yet finds a new product
+                issued = last_issuance(product, now)
+                changed = seen_issuance.get(product) != issued
+                seen_issuance[product] = issued
+            schedule.mark_refreshed(product, now, changed=changed)
+
+        schedule.observe(**known)
+        now += max(1.0, schedule.sleep_time(now))
+
+    return requests, polls
+
+
+def report(label, requests, polls, records):
+    parts = [f"{label:<9} {requests:5d} requests"]
+    for field in ("severity", "mesoscale_active"):
+        latencies = detection_latency(changes(records, field), polls[field])
+        if latencies:
+            parts.append(f"{field} latency mean {statistics.mean(latencies) / 60:5.1f} min"
+                         f" / max {max(latencies) / 60:5.1f} min")
+    print("  " + "   ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("days", nargs="*",
+                        default=sorted(glob.glob(os.path.join(HERE, "fixtures", "days", "*.jsonl"))))
+    parser.add_argument("--budget", type=int, default=REQUEST_BUDGET)
+    args = parser.parse_args()
+
+    total_cron = total_adaptive = 0
+    for path in args.days:
+        records = load_day(path)
+        print(os.path.basename(path))
+        cron_requests, cron_polls = simulate_cron(records)
+        adaptive_requests, adaptive_polls = simulate_adaptive(records, args.budget)
+        report("cron", cron_requests, cron_polls, records)
+        report("adaptive", adaptive_requests, adaptive_polls, records)
+        total_cron += cron_requests
+        total_adaptive += adaptive_requests
+
+    if total_cron:
+        print(f"adaptive policy: {total_adaptive} vs {total_cron} requests "
+              f"({100 * (1 - total_adaptive / total_cron):.0f}% fewer)")
+
+
+if __name__ == "__main__":
+    main()
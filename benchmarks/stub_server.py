@@ -0,0 +1,138 @@
+"""
+Local stand-in for api.weather.gov and www.spc.noaa.gov.
+
+Serves one scenario directory:
+    outlook_day1.geojson .. outlook_day3.geojson
+    spcmdrss.xml
+    alerts.json
+    points.json            properties template for every /points lookup
+    forecast_hourly.json   served for every gridpoint
+
+/points/{lat},{lon} hands out a distinct forecastHourly URL per point so
+many-location runs exercise the same request pattern as the real API.
+Every response carries an ETag and honours If-None-Match.
+
+    with StubServer(scenario_dir) as stub:
+        http_client.set_client(http_client.HttpClient(rewrite=stub.rewrite))
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+NWS = "https://api.weather.gov"
+SPC = "https://www.spc.noaa.gov"
+
+_STATIC = {
+    "/products/outlook/day1otlk_cat.nolyr.geojson": ("outlook_day1.geojson", "application/geo+json"),
+    "/products/outlook/day2otlk_cat.nolyr.geojson": ("outlook_day2.geojson", "application/geo+json"),
+    "/products/outlook/day3otlk_cat.nolyr.geojson": ("outlook_day3.geojson", "application/geo+json"),
+    "/products/spcmdrss.xml": ("spcmdrss.xml", "application/rss+xml"),
+    "/alerts": ("alerts.json", "application/geo+json"),
+    "/alerts/active": ("alerts.json", "application/geo+json"),
+}
+_POINTS = re.compile(r"^/points/(-?[\d.]+),(-?[\d.]+)$")
+_HOURLY = re.compile(r"^/gridpoints/\w+/\d+,\d+/forecast/hourly$")
+
+
+class StubServer:
+    def __init__(self, scenario_dir, host="127.0.0.1", port=0):
+        self.scenario_dir = scenario_dir
+        self.requests = Counter()
+        self._files = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def rewrite(self):
+        return {NWS: self.url, SPC: self.url}
+
+    def _file(self, name):
+        with self._lock:
+            if name not in self._files:
+                with open(os.path.join(self.scenario_dir, name), "rb") as f:
+                    body = f.read()
+                self._files[name] = (body, '"%s"' % hashlib.sha1(body).hexdigest())
+            return self._files[name]
+
+    def _points(self, lat, lon):
+        template = json.loads(self._file("points.json")[0])
+        properties = template.setdefault("properties", {})
+        x, y = int((float(lon) + 180) * 40), int((float(lat) + 90) * 40)
+        properties["forecastHourly"] = f"{NWS}/gridpoints/STB/{x},{y}/forecast/hourly"
+        body = json.dumps(template).encode("utf-8")
+        return body, '"%s"' % hashlib.sha1(body).hexdigest(), "application/geo+json"
+
+    def route(self, path):
+        if path in _STATIC:
+            name, content_type = _STATIC[path]
+            return self._file(name) + (content_type,)
+        match = _POINTS.match(path)
+        if match:
+            return self._points(*match.groups())
+        if _HOURLY.match(path):
+            return self._file("forecast_hourly.json") + ("application/geo+json",)
+        return None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this
+            # keep-alive clients eat a delayed-ACK stall on every request
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                stub.requests[path.split("/")[1] if "/" in path else path] += 1
+                found = stub.route(path)
+                if found is None:
+                    self._send(404, b'{"title": "Not Found"}', "application/problem+json")
+                    return
+                body, etag, content_type = found
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", content_type, etag)
+                else:
+                    self._send(200, body, content_type, etag)
+
+            def _send(self, status, body, content_type, etag=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,129 @@
+"""
+Active NWS alerts tracked per location, keyed by alert id.
+
+Each fetch is applied as a delta against what the location had last
+time: alerts that appear are "new"; alerts whose content changed, or
+that replace a tracked alert through their CAP references, are
+"updated"; tracked alerts that are gone are "expired". Subscribers get
+one event per change, and each location's revision only moves when
+something did change, so callers can skip re-rendering otherwise.
+
+State is kept in a small JSON file next to the other caches so cron runs
+pick up where the last one stopped.
+"""
+
+import os
+import threading
+import time
+
+import http_cache
+
+# Alert properties kept per tracked alert
+RECORD_FIELDS = ("id", "event", "sent", "onset", "expires", "severity", "urgency",
+                 "headline", "description")
+
+
+def alert_record(properties):
+    return {field: properties.get(field) for field in RECORD_FIELDS}
+
+
+def referenced_ids(properties):
+    return [ref.get("identifier") for ref in properties.get("references") or []]
+
+
+class AlertStore:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(http_cache.DEFAULT_DIR, "alerts.json")
+        self._lock = threading.Lock()
+        self._scopes = None
+        self._subscribers = []
+
+    def _load(self):
+        if self._scopes is None:
+            self._scopes = http_cache.load_json(self.path, {})
+        return self._scopes
+
+    def _save(self):
+        http_cache.write_json_atomic(self.path, self._scopes)
+
+    def subscribe(self, callback):
+        """callback(event) for every change; event is {"type", "scope", "alert", "replaces"}."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def active(self, scope):
+        """{alert id: record} currently tracked for scope."""
+        with self._lock:
+            return dict(self._load().get(scope, {}).get("alerts", {}))
+
+    def revision(self, scope):
+        with self._lock:
+            return self._load().get(scope, {}).get("revision", 0)
+
+    def apply(self, scope, features):
+        """
+        Replaces scope's alerts with the features of a fresh fetch and
+        returns the change events (empty when nothing changed).
+        """
+        current = {}
+        replaces = {}
+        for feature in features:
+            properties = feature["properties"]
+            if properties.get("event") and properties.get("id"):
+                current[properties["id"]] = alert_record(properties)
+                replaces[properties["id"]] = referenced_ids(properties)
+
+        with self._lock:
+            state = self._load().setdefault(scope, {"revision": 0, "alerts": {}})
+            previous = state["alerts"]
+            events = []
+            consumed = set()
+            for alert_id, record in current.items():
+                old = previous.get(alert_id)
+                if old == record:
+                    continue
+                if old is not None:
+                    events.append({"type": "updated", "scope": scope, "alert": record, "replaces": alert_id})
+                    continue
+                # NWS updates arrive under a new id that references the old one
+                replaced = next((ref for ref in replaces[alert_id]
+                                 if ref in previous and ref not in current), None)
+                if replaced is not None:
+                    consumed.add(replaced)
+                    events.append({"type": "updated", "scope": scope, "alert": record, "replaces": replaced})
+                else:
+                    events.append({"type": "new", "scope": scope, "alert": record, "replaces": None})
+            for alert_id, record in previous.items():
+                if alert_id not in current and alert_id not in consumed:
+                    events.append({"type": "expired", "scope": scope, "alert": record, "replaces": None})
+
+            if events:
+                state["alerts"] = current
+                state["revision"] += 1
+                state["changed_at"] = time.time()
+                self._save()
+
+        for event in events:
+            for callback in self._subscribers:
+                callback(event)
+        return events
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_alert_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AlertStore()
+    return _store
+
+
+def set_alert_store(store):
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
@@ -0,0 +1,148 @@
+"""
+Process-pool fan-out for large batch runs (workflow.py --batch --processes N).
+
+The parent does what happens once per run: resolving gridpoints,
+downloading the national products and matching the area's alerts to
+every location (workflow.fetch_national). The parent then writes the
+raw bodies it used to a directory of its own for the run, and workers
+load the products from those files, so every worker evaluates exactly
+the issuance the parent fetched whatever happens to the HTTP cache
+meanwhile. Their rasterized grids and parsed geometries are already on
+disk (risk_grid.py, geometry_store.py), so workers memory-map those
+instead of being sent the products pickled or parsing them again.
+
+Locations are split into chunks. A worker fetches and reduces the hourly
+forecasts of its chunk in one columnar pass, evaluates the grids and
+renders and hashes every location (including its run archive rows), and
+sends back only those results. The parent streams them, as chunks
+finish, into a single publish.BatchPublisher and the run archive.
+"""
+
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import gridpoints
+import http_cache
+import http_client
+import workflow
+from main import MD_FEED_URL, OUTLOOK_URLS, fetch_mesoscale_grid, fetch_outlook_grid, product_body
+from publish import BatchPublisher, payload_digest
+from run_archive import encode_summary
+
+# name -> (loader, args, URL of the product it loads)
+NATIONAL_LOADERS = {
+    "mesoscales": (fetch_mesoscale_grid, (), MD_FEED_URL),
+    "day1": (fetch_outlook_grid, (1,), OUTLOOK_URLS[1]),
+    "day2": (fetch_outlook_grid, (2,), OUTLOOK_URLS[2]),
+    "day3": (fetch_outlook_grid, (3,), OUTLOOK_URLS[3]),
+}
+CHUNKS_PER_PROCESS = 4   # smaller chunks even out slow forecast fetches
+
+_national = None
+_national_paths = {}
+
+
+def _init_worker(rewrite, cache_root, http_dir, gridpoint_path, national_paths):
+    global _national_paths
+    # Same on-disk caches as the parent, wherever it pointed them
+    http_cache.DEFAULT_DIR = cache_root
+    http_client.set_client(http_client.HttpClient(rewrite=rewrite))
+    http_cache.set_cache(http_cache.ResponseCache(http_dir))
+    gridpoints.set_gridpoint_cache(gridpoints.GridpointCache(gridpoint_path))
+    _national_paths = national_paths
+
+
+def _pin_national(names, directory):
+    """
+    Writes the bodies of the parent's national products to directory;
+    returns {name: path}.
+    """
+    paths = {}
+    for name in names:
+        body = product_body(NATIONAL_LOADERS[name][2])
+        if body is None:
+            continue
+        paths[name] = os.path.join(directory, name)
+        with open(paths[name], "wb") as f:
+            f.write(body)
+    return paths
+
+
+def _load_national(names, national_sources):
+    """The parent's national products, loaded once per worker from disk."""
+    global _national
+    if _national is None:
+        national, sources = {}, dict(national_sources)
+        for name in names:
+            func, args, _ = NATIONAL_LOADERS[name]
+            try:
+                with open(_national_paths[name], "rb") as f:
+                    national[name] = func(*args, body=f.read())
+            except Exception as e:
+                sources[name] = {"status": "failed", "elapsed": None, "error": repr(e)}
+        _national = national, sources
+    return _national
+
+
+def _summarize_chunk(task):
+    """
+    [(name, payload digest, complication JSON, modular JSON, point key,
+    archive rows)] for a chunk.
+    """
+    locations, names, national_sources, alerts = task
+    national, sources = _load_national(names, national_sources)
+    summaries = workflow.summarize_locations(locations, national, sources, alerts)
+    rendered = []
+    for loc in locations:
+        summary = summaries[loc["name"]]
+        simple = workflow.simplify_for_complication(summary)
+        rendered.append((
+            loc["name"], payload_digest(simple),
+            workflow.build_complication_json(simple),
+            workflow.build_modular_large_json(simple["four_days_grid"]),
+            gridpoints.point_key(loc["latitude"], loc["longitude"]), encode_summary(summary),
+        ))
+    return rendered
+
+
+def run_batch(locations, out_dir, processes, max_age=None):
+    """
+    get_weather_summaries + write_batch_outputs across processes. Returns
+    how many locations were written.
+    """
+    national, national_sources, alerts = workflow.fetch_national(locations)
+    names = [name for name in NATIONAL_LOADERS if name in national]
+
+    size = max(1, math.ceil(len(locations) / (processes * CHUNKS_PER_PROCESS)))
+    tasks = [
+        (chunk, names, national_sources, {loc["name"]: alerts[loc["name"]] for loc in chunk})
+        for chunk in (locations[i:i + size] for i in range(0, len(locations), size))
+    ]
+
+    os.makedirs(http_cache.DEFAULT_DIR, exist_ok=True)
+    pinned = tempfile.mkdtemp(prefix="national-", dir=http_cache.DEFAULT_DIR)
+    try:
+        client = http_client.get_client()
+        initargs = (
+            getattr(client, "rewrite", {}),
+            http_cache.DEFAULT_DIR,
+            os.path.dirname(http_cache.get_cache().directory),
+            gridpoints.get_gridpoint_cache().path,
+            _pin_national(names, pinned),
+        )
+        publisher = BatchPublisher(out_dir, max_age)
+        # spawn, not fork: the parent holds open keep-alive sockets and threads
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            for rendered in pool.imap_unordered(_summarize_chunk, tasks):
+                for name, digest, complication_json, modular_json, _, _ in rendered:
+                    if publisher.due(name, digest):
+                        publisher.write(name, digest, complication_json, modular_json)
+                workflow.archive_encoded({key: rows for *_, key, rows in rendered}, publisher.now)
+        publisher.close()
+    finally:
+        shutil.rmtree(pinned, ignore_errors=True)
+    return publisher.written
@@ -0,0 +1,69 @@
+"""
+Minimal streaming RSS/Atom reader for the SPC mesoscale discussion feed.
+
+All the MD pipeline needs from each entry is the GUID, title, pubDate and
+the <pre> block of the description, so this walks the document with
+xml.etree.ElementTree.iterparse and yields just those fields, clearing
+each entry as soon as it has been read. No HTML sanitising is done.
+"""
+
+import io
+import re
+from collections import namedtuple
+from xml.etree.ElementTree import iterparse
+
+FeedItem = namedtuple("FeedItem", ["guid", "title", "published", "pre"])
+
+_PRE = re.compile(r"<pre[^>]*>(.*?)</pre>", re.DOTALL | re.IGNORECASE)
+
+# RSS <item> / Atom <entry> children we care about, by local tag name
+_GUID_TAGS = ("guid", "id")
+_TITLE_TAGS = ("title",)
+_DATE_TAGS = ("pubDate", "published", "updated")
+_BODY_TAGS = ("description", "summary", "content")
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _first(fields, names):
+    for name in names:
+        value = fields.get(name)
+        if value:
+            return value
+    return None
+
+
+def iter_items(body):
+    """Yields a FeedItem per RSS item / Atom entry, in document order."""
+    source = io.BytesIO(body) if isinstance(body, (bytes, bytearray)) else io.StringIO(body)
+
+    fields = {}
+    depth = 0
+    for event, elem in iterparse(source, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag in ("item", "entry"):
+                depth += 1
+                fields = {}
+            continue
+
+        if tag in ("item", "entry"):
+            depth -= 1
+            link = _first(fields, ("link",))
+            text = _first(fields, _BODY_TAGS) or ""
+            match = _PRE.search(text)
+            yield FeedItem(
+                guid=_first(fields, _GUID_TAGS) or link,
+                title=(_first(fields, _TITLE_TAGS) or "").strip(),
+                published=_first(fields, _DATE_TAGS),
+                pre=match.group(1) if match else None,
+            )
+            elem.clear()
+        elif depth:
+            if tag == "link" and not elem.text:
+                # Atom links carry the URL in href
+                fields.setdefault("link", elem.get("href"))
+            else:
+                fields.setdefault(tag, (elem.text or "").strip())
@@ -0,0 +1,134 @@
+"""
+Columnar processing of NWS hourly forecast periods.
+
+Periods for one or many locations are parsed once into parallel NumPy
+arrays (location, epoch, local day, local hour, temperature, PoP). Daily
+highs, 5pm temperatures and rain alerts are then computed with
+group-by-day reductions over those arrays instead of re-parsing
+startTime for every lookup.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+RAIN_ALERT_POP = 30      # first future hour above this % gets an alert
+AFTERNOON_HOUR = 17      # "afternoon_high" is the 5pm temperature
+MIDNIGHT_CUTOFF = 12     # daily high before noon -> midnight high
+
+
+class HourlyColumns:
+    """Hourly periods for one or more locations as parallel arrays."""
+
+    def __init__(self, loc, epoch, day, hour, temp, pop, start_times, n_locations):
+        self.loc = loc
+        self.epoch = epoch
+        self.day = day
+        self.hour = hour
+        self.temp = temp
+        self.pop = pop
+        self.start_times = start_times
+        self.n_locations = n_locations
+
+    def __len__(self):
+        return len(self.epoch)
+
+    @classmethod
+    def from_periods(cls, periods_by_location):
+        """Builds columns from a list of NWS period lists, one per location."""
+        loc, epoch, day, hour, temp, pop, start_times = [], [], [], [], [], [], []
+        for i, periods in enumerate(periods_by_location):
+            for period in periods:
+                start = datetime.fromisoformat(period["startTime"])
+                loc.append(i)
+                epoch.append(int(start.timestamp()))
+                day.append(start.toordinal())
+                hour.append(start.hour)
+                temp.append(period["temperature"])
+                value = (period.get("probabilityOfPrecipitation") or {}).get("value")
+                pop.append(value if value is not None else 0)
+                start_times.append(period["startTime"])
+
+        # Group-by below relies on (location, time) order
+        loc = np.array(loc, dtype=np.int32)
+        epoch = np.array(epoch, dtype=np.int64)
+        order = np.lexsort((epoch, loc))
+        return cls(
+            loc=loc[order],
+            epoch=epoch[order],
+            day=np.array(day, dtype=np.int32)[order],
+            hour=np.array(hour, dtype=np.int8)[order],
+            temp=np.array(temp, dtype=np.float32)[order],
+            pop=np.array(pop, dtype=np.int16)[order],
+            start_times=[start_times[j] for j in order],
+            n_locations=len(periods_by_location),
+        )
+
+    def _day_segments(self):
+        """Start index of every (location, day) run."""
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        change = (np.diff(self.loc) != 0) | (np.diff(self.day) != 0)
+        return np.concatenate(([0], np.flatnonzero(change) + 1))
+
+    @staticmethod
+    def _first_in_segment(mask, starts):
+        """Index of the first True per segment, -1 where there is none."""
+        first = np.full(len(starts), -1, dtype=np.int64)
+        hits = np.flatnonzero(mask)
+        if len(hits):
+            seg = np.searchsorted(starts, hits, side="right") - 1
+            seg_ids, idx = np.unique(seg, return_index=True)
+            first[seg_ids] = hits[idx]
+        return first
+
+    def midnight_highs(self):
+        """Per location, {date: {daily_high, hour_of_daily_high, afternoon_high}}."""
+        result = [{} for _ in range(self.n_locations)]
+        starts = self._day_segments()
+        if not len(starts):
+            return result
+
+        lengths = np.diff(np.append(starts, len(self)))
+        daily_max = np.maximum.reduceat(self.temp, starts)
+        max_idx = self._first_in_segment(self.temp == np.repeat(daily_max, lengths), starts)
+        pm_idx = self._first_in_segment(self.hour == AFTERNOON_HOUR, starts)
+
+        seg_loc = self.loc[starts]
+        # The last (usually partial) day of each location is skipped
+        is_last = np.append(seg_loc[1:] != seg_loc[:-1], True)
+        max_hour = self.hour[max_idx]
+
+        for s in np.flatnonzero(~is_last & (max_hour < MIDNIGHT_CUTOFF)):
+            pm = pm_idx[s]
+            result[seg_loc[s]][self.start_times[starts[s]][:10]] = {
+                "daily_high": int(daily_max[s]),
+                "hour_of_daily_high": int(max_hour[s]),
+                "afternoon_high": int(self.temp[pm]) if pm >= 0 else None,
+            }
+        return result
+
+    def rain_alerts(self, now=None):
+        """Per location, {date: {start_time, probability}} for the first wet future hour."""
+        result = [{} for _ in range(self.n_locations)]
+        now = time.time() if now is None else now
+        starts = self._day_segments()
+        if not len(starts):
+            return result
+
+        first = self._first_in_segment((self.epoch > now) & (self.pop > RAIN_ALERT_POP), starts)
+        for i in first[first >= 0]:
+            start_time = datetime.fromisoformat(self.start_times[i])
+            result[self.loc[i]][start_time.date().isoformat()] = {
+                "start_time": start_time.strftime("%A %m/%d at %I%p"),
+                "probability": int(self.pop[i]),
+            }
+        return result
+
+    def forecast_data(self, now=None):
+        """Per location, the forecast_data dict get_forecast returns."""
+        return [
+            {"midnighthigh": highs, "rainalerts": rain}
+            for highs, rain in zip(self.midnight_highs(), self.rain_alerts(now))
+        ]
@@ -0,0 +1,32 @@
+"""
+Streaming reader for GeoJSON FeatureCollections.
+
+Features are decoded one at a time straight out of the "features" array
+instead of json.loads-ing the whole document.
+"""
+
+import json
+import re
+
+_FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+_WHITESPACE = re.compile(r"[\s,]*")
+_decoder = json.JSONDecoder()
+
+
+def iter_features(body):
+    """Yields each feature dict of a FeatureCollection in document order."""
+    text = body.decode("utf-8") if isinstance(body, (bytes, bytearray)) else body
+
+    match = _FEATURES_START.search(text)
+    if match is None:
+        # Not the layout we expect, fall back to a full parse
+        yield from json.loads(text).get("features", [])
+        return
+
+    pos = match.end()
+    while True:
+        pos = _WHITESPACE.match(text, pos).end()
+        if pos >= len(text) or text[pos] == "]":
+            return
+        feature, pos = _decoder.raw_decode(text, pos)
+        yield feature
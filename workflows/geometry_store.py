@@ -0,0 +1,114 @@
+"""
+Binary cache of parsed product geometries.
+
+Building an outlook index from scratch means decoding the GeoJSON and
+running shape() on every feature. The first run that sees an issuance
+saves the geometries as flat arrays (shapely's ragged-array layout:
+one float64 coordinate array plus ring/part offset arrays, as .npy) with
+a small JSON sidecar for per-geometry labels. Later runs memory-map the
+arrays and rebuild the geometries in one from_ragged_array call.
+
+Entries are keyed by product, issuance time and body digest, e.g.
+.cache/geometries/day1-202605061256-3f2a9c81d0e4/, and older issuances
+of a product are removed when a new one is saved.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+
+import numpy as np
+import shapely
+
+import http_cache
+
+_ISSUE = re.compile(rb'"ISSUE"\s*:\s*"(\d{12})"')
+
+
+def product_key(product, body):
+    """product-issuance-digest for a downloaded body."""
+    match = _ISSUE.search(body)
+    issued = match.group(1).decode() if match else "unknown"
+    return f"{product}-{issued}-{hashlib.sha1(body).hexdigest()[:12]}"
+
+
+class GeometryStore:
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(http_cache.DEFAULT_DIR, "geometries")
+
+    def load(self, key):
+        """(geometries, labels) saved under key, or None."""
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            if not meta["count"]:
+                return np.array([], dtype=object), meta["labels"]
+            coords = np.load(os.path.join(path, "coords.npy"), mmap_mode="r")
+            offsets = tuple(
+                np.load(os.path.join(path, f"offsets{i}.npy"), mmap_mode="r")
+                for i in range(meta["offsets"])
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+        geometries = shapely.from_ragged_array(shapely.GeometryType(meta["type"]), coords, offsets)
+        return geometries, meta["labels"]
+
+    def save(self, key, geometries, labels):
+        """Saves geometries (polygonal) with one JSON-able label each."""
+        geometries = np.asarray(geometries, dtype=object)
+        meta = {"count": len(geometries), "labels": labels, "offsets": 0}
+        arrays = {}
+        if len(geometries):
+            try:
+                kind, coords, offsets = shapely.to_ragged_array(geometries)
+            except ValueError:
+                return  # mixed geometry kinds; not worth caching
+            meta.update(type=int(kind), offsets=len(offsets))
+            arrays["coords"] = coords
+            arrays.update((f"offsets{i}", offset) for i, offset in enumerate(offsets))
+
+        path = os.path.join(self.directory, key)
+        tmp = http_cache.temp_path(path)
+        os.makedirs(tmp, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Another process saved the same issuance first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.prune(key)
+
+    def prune(self, key):
+        """Removes other issuances of key's product."""
+        product = key.rsplit("-", 2)[0]
+        for name in os.listdir(self.directory):
+            if name != key and name.rsplit("-", 2)[0] == product and not name.endswith(".tmp"):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_geometry_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = GeometryStore()
+    return _store
+
+
+def set_geometry_store(store):
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
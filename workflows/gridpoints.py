@@ -0,0 +1,128 @@
+"""
+Persistent cache of NWS /points lookups.
+
+The point -> forecast office/grid mapping almost never changes, so the
+forecastHourly URL, the UGC zones (forecast, county, fire weather) and
+cwa are kept in a small JSON file
+keyed by lat/lon rounded to 4 decimals (the precision /points accepts).
+Entries are refreshed lazily: after GRIDPOINT_TTL, or when the cached
+forecastHourly URL starts returning 404.
+
+Lookups only update the cache in memory. The pipeline calls
+save_gridpoints() once its fetches are done, so a batch of misses
+rewrites the file once rather than once per miss.
+"""
+
+import os
+import threading
+import time
+
+import http_cache
+import http_client
+import metrics
+
+GRIDPOINT_TTL = 30 * 24 * 3600
+POINTS_URL = "https://api.weather.gov/points/{lat},{lon}"
+FIELDS = ("forecastHourly", "forecastZone", "county", "fireWeatherZone", "cwa")
+ZONE_FIELDS = ("forecastZone", "county", "fireWeatherZone")
+
+
+def point_key(latitude, longitude):
+    return f"{round(float(latitude), 4)},{round(float(longitude), 4)}"
+
+
+def zone_ids(entry):
+    """UGC ids of a resolved gridpoint, e.g. ["KSZ105", "KSC091", "KSZ105"]."""
+    return [entry[field].rsplit("/", 1)[-1] for field in ZONE_FIELDS if entry.get(field)]
+
+
+class GridpointCache:
+    def __init__(self, path=None, ttl=GRIDPOINT_TTL):
+        self.path = path or os.path.join(http_cache.DEFAULT_DIR, "gridpoints.json")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = http_cache.load_json(self.path, {})
+        return self._entries
+
+    def save(self):
+        """Writes the file if any lookup changed it since the last save."""
+        with self._lock:
+            if self._dirty:
+                http_cache.write_json_atomic(self.path, self._entries)
+                self._dirty = False
+
+    def resolve(self, latitude, longitude, refresh=False):
+        """Returns FIELDS plus "fetched_at" for a point."""
+        key = point_key(latitude, longitude)
+        with self._lock:
+            entry = self._load().get(key)
+        # Entries written before a field was added are refetched
+        if (entry and not refresh and all(field in entry for field in FIELDS)
+                and time.time() - entry["fetched_at"] < self.ttl):
+            metrics.record_cache("hit")
+            return entry
+
+        metrics.record_cache("miss")
+        lat, lon = key.split(",")
+        properties = http_client.get_json(POINTS_URL.format(lat=lat, lon=lon))["properties"]
+        entry = {field: properties.get(field) for field in FIELDS}
+        entry["fetched_at"] = time.time()
+
+        with self._lock:
+            self._load()[key] = entry
+            self._dirty = True
+        return entry
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_gridpoint_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GridpointCache()
+    return _cache
+
+
+def set_gridpoint_cache(cache):
+    global _cache
+    with _cache_lock:
+        previous, _cache = _cache, cache
+    return previous
+
+
+def resolve_gridpoint(latitude, longitude, refresh=False):
+    return get_gridpoint_cache().resolve(latitude, longitude, refresh=refresh)
+
+
+def save_gridpoints():
+    get_gridpoint_cache().save()
+
+
+def get_hourly_forecast(latitude, longitude):
+    """
+    Fetches the hourly forecast for a point using the cached gridpoint.
+    A 404 on the cached URL means the grid moved: re-resolve and retry once.
+    """
+    import requests
+
+    with metrics.stage("get_forecast.points"):
+        gridpoint = resolve_gridpoint(latitude, longitude)
+    try:
+        with metrics.stage("get_forecast.hourly"):
+            return http_client.get_cached_json(gridpoint["forecastHourly"], "forecast")
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+    with metrics.stage("get_forecast.points"):
+        gridpoint = resolve_gridpoint(latitude, longitude, refresh=True)
+    with metrics.stage("get_forecast.hourly"):
+        return http_client.get_cached_json(gridpoint["forecastHourly"], "forecast")
@@ -0,0 +1,183 @@
+"""
+Record and replay upstream HTTP traffic.
+
+RecordingClient passes every request through to the real hosts and keeps
+the responses. ReplayClient serves them back from the archive without
+touching the network, optionally adding latency and failures:
+
+    python workflow.py --record run.grove     # capture a live run
+    python workflow.py --replay run.grove     # rerun it offline
+
+The archive is a zip: index.json maps each URL to its status, headers and
+body digest, and bodies/<digest> holds each distinct body once (deflated).
+Hourly forecasts and outlooks that repeat across locations and polls are
+stored a single time.
+
+Replay matches the exact URL first, then falls back to the last response
+recorded for a URL of the same shape (numbers masked), so one recorded
+location can stand in for thousands of simulated ones.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import zipfile
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import metrics
+from http_client import HttpClient
+
+INDEX = "index.json"
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def url_shape(url):
+    return _NUMBER.sub("#", url)
+
+
+class HttpArchive:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}   # url -> {"status", "headers", "body"}
+        self.bodies = {}    # digest -> bytes
+        self._shapes = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        archive = cls(path)
+        with zipfile.ZipFile(path) as z:
+            archive.entries = json.loads(z.read(INDEX))
+            for digest in {entry["body"] for entry in archive.entries.values()}:
+                archive.bodies[digest] = z.read(f"bodies/{digest}")
+        return archive
+
+    def add(self, url, response):
+        body = response.content
+        digest = hashlib.sha1(body).hexdigest()
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        with self._lock:
+            self.bodies.setdefault(digest, body)
+            self.entries[url] = {"status": response.status_code, "headers": headers, "body": digest}
+            self._shapes = None
+
+    def save(self):
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as z:
+                z.writestr(INDEX, json.dumps(self.entries, indent=1, sort_keys=True))
+                for digest, body in self.bodies.items():
+                    z.writestr(f"bodies/{digest}", body)
+        # Rename last so a crashed recording never clobbers a good archive
+        os.replace(tmp, self.path)
+
+    def lookup(self, url):
+        entry = self.entries.get(url)
+        if entry is None:
+            if self._shapes is None:
+                self._shapes = {url_shape(u): e for u, e in self.entries.items()}
+            entry = self._shapes.get(url_shape(url))
+        return entry
+
+
+class RecordingClient(HttpClient):
+    """HttpClient that also writes every response into an HttpArchive."""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def get(self, url, timeout=None, headers=None):
+        response = super().get(url, timeout=timeout, headers=headers)
+        if response.status_code != 304:
+            self.archive.add(url, response)
+        return response
+
+    def get_cached_content(self, url, source, timeout=None, cache=None):
+        # Skip the on-disk cache: a fresh hit would leave a hole in the archive
+        return self.get_content(url, timeout=timeout)
+
+    def close(self):
+        super().close()
+        self.archive.save()
+
+
+class ReplayClient(HttpClient):
+    """
+    HttpClient that answers from an HttpArchive.
+
+    latency/jitter (seconds) are slept before each response. error_rate is
+    the fraction of requests that fail, split between 503s and read
+    timeouts; these stand for failures that outlasted the real client's
+    retries, so they are not retried here. A delay longer than the read
+    timeout also ends in a timeout. Unknown URLs get a 404.
+    """
+
+    def __init__(self, archive, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failure = self._random.random() < self.error_rate
+            kind = self._random.choice(("status", "timeout"))
+            if failure:
+                self.failures += 1
+        return delay, failure and kind
+
+    def get(self, url, timeout=None, headers=None):
+        delay, failure = self._draw()
+        read_timeout = timeout or self.timeout
+        if isinstance(read_timeout, tuple):
+            read_timeout = read_timeout[1]
+        if delay > read_timeout:
+            delay, failure = read_timeout, "timeout"
+        if delay:
+            time.sleep(delay)
+        if failure == "timeout":
+            raise requests.ReadTimeout(f"injected timeout for {url}")
+        if failure == "status":
+            return _response(url, 503, {}, b'{"title": "Service Unavailable"}')
+
+        entry = self.archive.lookup(url)
+        if entry is None:
+            return _response(url, 404, {}, b'{"title": "Not Found"}')
+        etag = entry["headers"].get("ETag")
+        if etag and headers and headers.get("If-None-Match") == etag:
+            return _response(url, 304, entry["headers"], b"")
+        body = self.archive.bodies[entry["body"]]
+        metrics.record_bytes(len(body))
+        return _response(url, entry["status"], entry["headers"], body)
+
+    def get_cached_content(self, url, source, timeout=None, cache=None):
+        # Always the archive: a fresh on-disk entry would make replays differ
+        return self.get_content(url, timeout=timeout)
+
+    def close(self):
+        pass
+
+
+def _response(url, status, headers, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = "utf-8"
+    return response
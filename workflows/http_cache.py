@@ -0,0 +1,225 @@
+"""
+On-disk HTTP response cache with ETag / Last-Modified revalidation.
+
+Each URL is stored as two files under the cache directory:
+    <key>.body   raw response body
+    <key>.json   url, etag, last_modified, fetched_at, used_at, size
+
+Within a source's TTL the cached body is returned without touching the
+network. After that a conditional request is sent, and a 304 reuses the
+cached body. The directory is kept under max_bytes by evicting the least
+recently used entries, so it can be persisted between cron runs (see the
+actions/cache step in weather.yml). A running byte total decides when
+that is needed, so the directory is only scanned once it is over the
+cap, and the national products (PINNED_SOURCES) are never evicted to
+make room for per-point forecasts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_DIR = os.getenv(
+    "GROVE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+DEFAULT_MAX_BYTES = int(os.getenv("GROVE_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+# Seconds a cached body is trusted without revalidating. 0 means always
+# send a conditional request. Sources not listed here are not cached.
+CACHE_TTLS = {
+    "outlook": 600,          # SPC day 1-3 outlooks, a handful of issuances a day
+    "mesoscale_feed": 120,   # SPC MD RSS
+    "forecast": 600,         # NWS hourly forecast, updated about hourly
+}
+# One body per run shared by every location; a batch's per-point forecasts
+# must not push them out
+PINNED_SOURCES = ("outlook", "mesoscale_feed")
+EVICT_TO = 0.9   # eviction frees space down to this share of max_bytes
+
+
+# Atomic file helpers shared by every on-disk store under DEFAULT_DIR
+
+
+def temp_path(path):
+    """Where to write path's next version; unique per process and thread."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def atomic_write(path, data, mode="wb"):
+    """Writes data next to path and renames it over, so readers never see half a file."""
+    tmp = temp_path(path)
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """atomic_write for a JSON document, creating path's directory if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = temp_path(path)
+    with open(tmp, "w") as f:
+        json.dump(data, f, **dump_kwargs)
+    os.replace(tmp, path)
+
+
+def load_json(path, default=None):
+    """The JSON document at path, or default if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class CacheEntry:
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+
+    @property
+    def age(self):
+        return time.time() - self.meta.get("fetched_at", 0)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    def read(self):
+        with open(self.cache.body_path(self.key), "rb") as f:
+            return f.read()
+
+
+class ResponseCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.join(directory or DEFAULT_DIR, "http")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = None   # key -> body size, for the running total
+        self._total = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def meta_path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def body_path(self, key):
+        return os.path.join(self.directory, key + ".body")
+
+    def lookup(self, url):
+        key = self.key_for(url)
+        meta = load_json(self.meta_path(key))
+        if meta is None:
+            return None
+        if not os.path.exists(self.body_path(key)):
+            return None
+        return CacheEntry(self, key, meta)
+
+    def _scan(self):
+        """[(used_at, key, size, source)] for every entry on disk."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta = load_json(os.path.join(self.directory, name))
+            if meta is not None:
+                entries.append((meta.get("used_at", 0), name[:-5], meta.get("size", 0), meta.get("source")))
+        return entries
+
+    def store(self, url, response, source=None):
+        key = self.key_for(url)
+        body = response.content
+        now = time.time()
+        meta = {
+            "url": url,
+            "source": source,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": now,
+            "used_at": now,
+            "size": len(body),
+        }
+        atomic_write(self.body_path(key), body)
+        atomic_write(self.meta_path(key), json.dumps(meta), mode="w")
+        with self._lock:
+            if self._sizes is None:
+                self._sizes = {key: size for _, key, size, _ in self._scan()}
+                self._total = sum(self._sizes.values())
+            else:
+                self._total += len(body) - self._sizes.get(key, 0)
+                self._sizes[key] = len(body)
+            if self._total > self.max_bytes:
+                self._evict()
+        return body
+
+    def revalidated(self, entry, response=None):
+        """Mark an entry fresh again after a 304 (or a TTL hit)."""
+        now = time.time()
+        if response is not None:
+            entry.meta["fetched_at"] = now
+            # Servers may rotate validators on a 304
+            entry.meta["etag"] = response.headers.get("ETag", entry.meta.get("etag"))
+            entry.meta["last_modified"] = response.headers.get(
+                "Last-Modified", entry.meta.get("last_modified"))
+        entry.meta["used_at"] = now
+        atomic_write(self.meta_path(entry.key), json.dumps(entry.meta), mode="w")
+
+    def evict(self):
+        """
+        Drop least-recently-used entries, never PINNED_SOURCES, until the
+        cache is back under EVICT_TO of max_bytes. Rescans the directory,
+        which other processes (fanout.py workers) may have written to.
+        """
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries = self._scan()
+        self._sizes = {key: size for _, key, size, _ in entries}
+        self._total = sum(self._sizes.values())
+        if self._total <= self.max_bytes:
+            return
+
+        for _, key, size, source in sorted(entries):
+            if self._total <= self.max_bytes * EVICT_TO:
+                break
+            if source in PINNED_SOURCES:
+                continue
+            for path in (self.meta_path(key), self.body_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            del self._sizes[key]
+            self._total -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def set_cache(cache):
+    """Replace the shared cache (returns the previous one)."""
+    global _cache
+    with _cache_lock:
+        previous, _cache = _cache, cache
+    return previous
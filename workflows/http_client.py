@@ -0,0 +1,171 @@
+"""
+Shared HTTP client for the fetchers in main.py.
+
+One requests.Session is reused across every call so connections to
+api.weather.gov and www.spc.noaa.gov stay alive between fetches. Retries
+with jittered backoff are handled by urllib3 on 429/5xx responses.
+
+Tests (or a local stub server) can swap the client out:
+
+    import http_client
+    http_client.set_client(http_client.HttpClient(
+        rewrite={"https://api.weather.gov": "http://127.0.0.1:8000"}))
+"""
+
+import json
+import threading
+
+import http_cache
+import metrics
+
+# NWS asks every API client to identify itself
+USER_AGENT = "grove-weather (github.com/dswean000/grove)"
+
+DEFAULT_TIMEOUT = (5, 15)  # (connect, read) seconds
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5        # 0.5s, 1s, 2s ...
+RETRY_JITTER = 0.5         # plus up to 0.5s of random jitter
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_HOSTS = 4             # api.weather.gov, www.spc.noaa.gov, + spare
+POOL_SIZE = 8              # keep-alive connections kept per host
+
+
+def build_session(retries=RETRY_TOTAL, pool_hosts=POOL_HOSTS, pool_size=POOL_SIZE):
+    # requests/urllib3 are a large share of startup; load them on first use
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=RETRY_BACKOFF,
+        backoff_jitter=RETRY_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_hosts, pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "gzip, deflate",
+    })
+    return session
+
+
+class HttpClient:
+    """
+    Thin wrapper around a pooled Session.
+
+    rewrite maps URL prefixes to replacements, e.g. pointing the real NWS
+    and SPC hosts at a local stub. It also applies to URLs that come back
+    inside API responses (like forecastHourly).
+    """
+
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, rewrite=None):
+        self.session = session or build_session()
+        self.timeout = timeout
+        self.rewrite = dict(rewrite or {})
+
+    def resolve(self, url):
+        for prefix, replacement in self.rewrite.items():
+            if url.startswith(prefix):
+                return replacement + url[len(prefix):]
+        return url
+
+    def get(self, url, timeout=None, headers=None):
+        response = self.session.get(
+            self.resolve(url),
+            timeout=timeout or self.timeout,
+            headers=headers,
+        )
+        # Wire size (compressed) when the server tells us, else the body
+        length = response.headers.get("Content-Length")
+        metrics.record_bytes(int(length) if length and length.isdigit() else len(response.content))
+        return response
+
+    def get_json(self, url, timeout=None):
+        response = self.get(url, timeout=timeout)
+        response.raise_for_status()
+        with metrics.stage("json_decode"):
+            return response.json()
+
+    def get_content(self, url, timeout=None):
+        response = self.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    def get_cached_content(self, url, source, timeout=None, cache=None):
+        """
+        Like get_content, but goes through the on-disk cache for sources
+        listed in http_cache.CACHE_TTLS. Fresh entries are served without a
+        request; stale ones are revalidated with If-None-Match /
+        If-Modified-Since and reused on 304.
+        """
+        ttl = http_cache.CACHE_TTLS.get(source)
+        if ttl is None:
+            return self.get_content(url, timeout=timeout)
+
+        cache = cache or http_cache.get_cache()
+        entry = cache.lookup(url)
+        if entry is not None and entry.age < ttl:
+            metrics.record_cache("hit")
+            cache.revalidated(entry)
+            return entry.read()
+
+        headers = entry.conditional_headers() if entry is not None else None
+        response = self.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            metrics.record_cache("revalidated")
+            cache.revalidated(entry, response)
+            return entry.read()
+
+        metrics.record_cache("miss")
+        response.raise_for_status()
+        return cache.store(url, response, source)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def set_client(client):
+    """Replace the shared client (returns the previous one)."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
+
+
+def get_json(url, timeout=None):
+    return get_client().get_json(url, timeout=timeout)
+
+
+def get_content(url, timeout=None):
+    return get_client().get_content(url, timeout=timeout)
+
+
+def get_cached_content(url, source, timeout=None):
+    return get_client().get_cached_content(url, source, timeout=timeout)
+
+
+def get_cached_json(url, source, timeout=None):
+    body = get_cached_content(url, source, timeout=timeout)
+    with metrics.stage("json_decode"):
+        return json.loads(body)
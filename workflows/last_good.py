@@ -0,0 +1,55 @@
+"""
+Last-known-good store for parsed source results.
+
+Every successful fetch is saved here (one small JSON file per source and
+location). When a source later times out or fails, the pipeline serves
+the saved result instead, marked stale with its age, while the fetch
+keeps going in the background and refreshes the store when it lands.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+import http_cache
+
+
+class LastGoodStore:
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(http_cache.DEFAULT_DIR, "last_good")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def put(self, key, value):
+        entry = {"key": key, "saved_at": time.time(), "value": value}
+        http_cache.write_json_atomic(self._path(key), entry)
+
+    def get(self, key):
+        """Returns (value, age_seconds) or None."""
+        entry = http_cache.load_json(self._path(key))
+        if entry is None:
+            return None
+        return entry["value"], time.time() - entry["saved_at"]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_last_good_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LastGoodStore()
+    return _store
+
+
+def set_last_good_store(store):
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
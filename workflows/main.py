@@ -1,232 +1,464 @@
-def get_watches(lat, long):
-    alerts_url = f"https://api.weather.gov/alerts?active=true&point={lat},{long}"
-    alerts_response = requests.get(alerts_url).json()
-    
-    #print(alerts_response)
+import re
+from datetime import datetime, timezone
+
+import gridpoints
+import http_client
+import metrics
+
+# shapely, numpy and the parsers are imported inside the functions that
+# need them, so importing this module (and workflow.py) stays cheap.
+# load_dependencies() pulls them all in before fetches start on threads.
+
+ALERTS_POINT_URL = "https://api.weather.gov/alerts?active=true&point={lat},{lon}"
+ALERTS_AREA_URL = "https://api.weather.gov/alerts/active?area={area}"
+ALERTS_ACTIVE_URL = "https://api.weather.gov/alerts/active"
+
+
+def load_dependencies():
+    """
+    Imports everything the fetchers import lazily, on the calling thread.
+    numpy and shapely imported for the first time from several fetch
+    threads at once can deadlock or stay half-initialized for the rest of
+    the process, so fetch_sources calls this before submitting anything.
+    Cheap once everything is loaded.
+    """
+    import requests  # noqa: F401
+    import shapely.geometry  # noqa: F401
+    import feed_reader  # noqa: F401
+    import forecast  # noqa: F401
+    import geojson_stream  # noqa: F401
+    import geometry_store  # noqa: F401
+    import md_store  # noqa: F401
+    import risk_grid  # noqa: F401
+    import spatial  # noqa: F401
+    http_client.get_client()
+
+
+_SEVERITY_ORDER = ("Unknown", "Minor", "Moderate", "Severe", "Extreme")
+
+
+def _watch_priority(record):
+    severity = record.get("severity")
+    rank = _SEVERITY_ORDER.index(severity) if severity in _SEVERITY_ORDER else 0
+    return rank, record.get("expires") or ""
+
+
+def watches_from_alerts(records):
+    """
+    watches dict ({event: details}) from alert records. When several
+    alerts share an event, the most severe (then longest running) one
+    represents it instead of whichever came last.
+    """
     watches = {}  # Initialize watches as an empty dictionary
 
-    for feature in alerts_response['features']:
-        # Extract required properties
-        props = feature['properties']
-        event = props.get('event')
-        if event:
-            watches[event] = {
-                "id"         : props.get('id'),
-                "onset"      : props.get('onset'),
-                "expires"    : props.get('expires'),
-                "severity"   : props.get('severity'),
-                "urgency"    : props.get('urgency'),
-                "headline"   : props.get('headline'),
-                "description": props.get('description')
-            }
+    for record in records:
+        event = record.get('event')
+        if not event:
+            continue
+        kept = watches.get(event)
+        if kept is not None and _watch_priority(kept) >= _watch_priority(record):
+            continue
+        watches[event] = record
+
+    return {
+        event: {
+            "id"         : record.get('id'),
+            "onset"      : record.get('onset'),
+            "expires"    : record.get('expires'),
+            "severity"   : record.get('severity'),
+            "urgency"    : record.get('urgency'),
+            "headline"   : record.get('headline'),
+            "description": record.get('description')
+        }
+        for event, record in watches.items()
+    }
 
-    return watches 
 
+def drop_expired_watches(watches, now=None):
+    """
+    watches without the entries whose "expires" has passed, for serving a
+    saved result. Entries with no (or an unreadable) expiry are kept.
+    """
+    now = now or datetime.now(timezone.utc)
+    kept = {}
+    for event, details in watches.items():
+        try:
+            expires = datetime.fromisoformat(details.get("expires") or "")
+        except (TypeError, ValueError):
+            expires = None
+        if expires is None or expires.tzinfo is None or expires > now:
+            kept[event] = details
+    return kept
+
+
+def watches_from_features(features):
+    return watches_from_alerts(feature['properties'] for feature in features)
+
+
+@metrics.timed("get_watches")
+def get_watches(lat, long, store=None):
+    """
+    Active alerts at a point. With an alert_store.AlertStore the fetch is
+    also applied as a delta to the point's tracked alerts, firing change
+    events for anything new, updated or expired.
+    """
+    alerts_url = ALERTS_POINT_URL.format(lat=lat, lon=long)
+    features = http_client.get_json(alerts_url)['features']
+    if store is not None:
+        store.apply(gridpoints.point_key(lat, long), features)
+    return watches_from_features(features)
+
+
+def alert_area(zones):
+    """Comma-separated state codes ("KS,MO") covering the UGC zone ids."""
+    return ",".join(sorted({zone[:2] for zone in zones if zone}))
+
+
+def fetch_alerts(area=None):
+    """
+    Downloads every active alert for area (see alert_area; the whole
+    country when empty) in one request, as a spatial.AlertIndex.
+    """
+    from spatial import AlertIndex
+
+    url = ALERTS_AREA_URL.format(area=area) if area else ALERTS_ACTIVE_URL
+    return AlertIndex(http_client.get_json(url)["features"])
+
+
+def watches_many(alerts, latitudes, longitudes, zones):
+    """get_watches for many points from one AlertIndex; zones are each point's UGC ids."""
+    return [
+        watches_from_features([alerts.features[i] for i in matched])
+        for matched in alerts.matching_many(longitudes, latitudes, zones)
+    ]
+
+
+MD_FEED_URL = "https://www.spc.noaa.gov/products/spcmdrss.xml"
+MD_PROBABILITY_PATTERN = r"Probability of Watch Issuance\.\.\.(\d+)\spercent"
+
+
+# --- helper: parse SPC compact coord like 39830183 ---
+def parse_spc_coord(coord):
+    lat = int(coord[:4]) / 100.0
+    lon = - (int(coord[4:]) / 100.0)
+    if lon > -10:   # heuristic fix: e.g. -1.83 should be -101.83
+        lon -= 100.0
+    return (lon, lat)  # shapely wants (x=lon, y=lat)
+
+
+# Parsed product indexes keyed by URL -> (sha1 of body, index). They are
+# only rebuilt when the downloaded product actually changes.
+_product_indexes = {}
+# URL -> the body the index above was last looked up with
+_product_bodies = {}
+
+
+def _indexed_product(url, body, build):
+    import hashlib
+
+    digest = hashlib.sha1(body).hexdigest()
+    _product_bodies[url] = body
+    cached = _product_indexes.get(url)
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+    index = build(body)
+    _product_indexes[url] = (digest, index)
+    return index
+
+
+_MD_COORD = re.compile(r"\b\d{8}\b")
+_MD_SUMMARY = re.compile(r"SUMMARY\.\.\.(.*?)DISCUSSION", re.DOTALL)
+_MD_PROBABILITY = re.compile(MD_PROBABILITY_PATTERN)
+
+
+def parse_mesoscale_text(pre_text):
+    """
+    Parses the <pre> block of one MD into
+    {"coords", "description", "summary", "probability"}, or None when it
+    has no usable polygon.
+    """
+    if not pre_text:
+        return None
+
+    # Extract 8-digit compact coords
+    coord_pattern = _MD_COORD.findall(pre_text)
+    if not coord_pattern:
+        return None
 
-def get_mesoscales(latitude, longitude):
-    import re
-    import feedparser
-    from shapely.geometry import Point, Polygon
+    formatted_coordinates = []
+    for coord in coord_pattern:
+        try:
+            formatted_coordinates.append(parse_spc_coord(coord))
+        except Exception:
+            continue
+
+    if len(formatted_coordinates) < 3:
+        return None
 
+    summary_match = _MD_SUMMARY.search(pre_text)
+    if summary_match:
+        summary = summary_match.group(1).strip()
+    else:
+        summary = pre_text[:200].strip()
+
+    prob_match = _MD_PROBABILITY.search(pre_text)
+
+    return {
+        "coords": formatted_coordinates,
+        "description": pre_text.strip(),
+        "summary": summary,
+        "probability": prob_match.group(1) if prob_match else "Unknown",
+    }
+
+
+def iter_mesoscale_feed(body):
+    """Yields (guid, title, pre_text) for each entry in the MD feed."""
+    from feed_reader import iter_items
+
+    for item in iter_items(body):
+        yield item.guid, item.title, item.pre
+
+
+@metrics.timed("parse_mesoscale_feed")
+def build_mesoscale_index(body):
+    """
+    Syncs the feed into the persistent MD store (only new entries are
+    parsed) and indexes every active discussion. A feed already indexed
+    by an earlier run is loaded from the geometry store instead.
+    """
+    from shapely.geometry import Polygon
+    from spatial import MesoscaleIndex
+    from md_store import get_md_store
+    from geometry_store import get_geometry_store, product_key
+
+    store = get_geometry_store()
+    key = product_key("mesoscales", body)
+    saved = store.load(key)
+    if saved is not None:
+        geometries, records = saved
+        return MesoscaleIndex(dict(record, polygon=polygon) for record, polygon in zip(records, geometries))
+
+    records = get_md_store().sync(iter_mesoscale_feed(body), parse_mesoscale_text)
+    index = MesoscaleIndex(dict(record, polygon=Polygon(record["coords"])) for record in records)
+    store.save(key, index.geometries, [
+        {field: value for field, value in record.items() if field != "coords"} for record in records
+    ])
+    return index
+
+
+def fetch_mesoscale_discussions():
+    """Downloads the SPC MD feed as a spatial.MesoscaleIndex."""
+    body = http_client.get_cached_content(MD_FEED_URL, "mesoscale_feed")
+    return _indexed_product(MD_FEED_URL, body, build_mesoscale_index)
+
+
+def fetch_mesoscale_grid(body=None):
+    """
+    fetch_mesoscale_discussions for large fleets: a risk_grid.GriddedMesoscales
+    that answers most points by array indexing. The grid is rebuilt
+    whenever the feed changes and kept on disk like the outlook grids.
+    Given a body (fanout.py workers get the parent's), nothing is downloaded.
+    """
+    from risk_grid import GriddedMesoscales, mesoscale_grid
+
+    if body is None:
+        body = http_client.get_cached_content(MD_FEED_URL, "mesoscale_feed")
+    index = _indexed_product(MD_FEED_URL, body, build_mesoscale_index)
+    grid = _indexed_product(f"{MD_FEED_URL}#grid", body, lambda b: mesoscale_grid(b, lambda: index))
+    return GriddedMesoscales(grid, index)
+
+
+def mesoscale_data_for(covering):
+    """
+    Summary dict for a point. The top-level fields come from the first MD
+    (in feed order) covering it; "discussions" lists every covering MD.
+    """
     mesoscale_data = {
         "summary": None,
         "description": None,
-        "probability": None
+        "probability": None,
+        "discussions": [
+            {"number": md.get("number"), "summary": md["summary"], "probability": md["probability"]}
+            for md in covering
+        ]
     }
 
-    feed_url = "https://www.spc.noaa.gov/products/spcmdrss.xml"
-    feed = feedparser.parse(feed_url)
-    pattern = r"Probability of Watch Issuance\.\.\.(\d+)\spercent"
-
-    # --- helper: parse SPC compact coord like 39830183 ---
-    def parse_spc_coord(coord):
-        lat = int(coord[:4]) / 100.0
-        lon = - (int(coord[4:]) / 100.0)
-        if lon > -10:   # heuristic fix: e.g. -1.83 should be -101.83
-            lon -= 100.0
-        return (lon, lat)  # shapely wants (x=lon, y=lat)
-
-    for item in feed.entries:
-        raw_desc = item.description
-        pre_match = re.search(r"<pre>(.*?)</pre>", raw_desc, re.DOTALL)
-        if not pre_match:
-            continue
+    if covering:
+        md = covering[0]
+        mesoscale_data["description"] = md["description"]
+        mesoscale_data["summary"] = md["summary"]
+        mesoscale_data["probability"] = md["probability"]
 
-        pre_text = pre_match.group(1)
+    if mesoscale_data["summary"] is None:
+        mesoscale_data["summary"] = "None"
+        mesoscale_data["probability"] = "0"
 
-        # Extract 8-digit compact coords
-        coord_pattern = re.findall(r"\b\d{8}\b", pre_text)
-        if not coord_pattern:
-            continue
+    return mesoscale_data
 
-        formatted_coordinates = []
-        for coord in coord_pattern:
-            try:
-                formatted_coordinates.append(parse_spc_coord(coord))
-            except Exception:
-                continue
 
-        if len(formatted_coordinates) < 3:
-            continue
+def mesoscales_at(discussions, latitude, longitude):
+    return mesoscale_data_for(discussions.covering(longitude, latitude))
 
-        polygon = Polygon(formatted_coordinates)
-        point = Point(longitude, latitude)
 
-        if polygon.contains(point):
-            mesoscale_data["description"] = pre_text.strip()
+def mesoscales_many(discussions, latitudes, longitudes):
+    return [
+        mesoscale_data_for([discussions.discussions[i] for i in covering])
+        for covering in discussions.covering_many(longitudes, latitudes)
+    ]
 
-            summary_match = re.search(r"SUMMARY\.\.\.(.*?)DISCUSSION", pre_text, re.DOTALL)
-            if summary_match:
-                mesoscale_data["summary"] = summary_match.group(1).strip()
-            else:
-                mesoscale_data["summary"] = pre_text[:200].strip()
 
-            prob_match = re.search(pattern, pre_text)
-            mesoscale_data["probability"] = prob_match.group(1) if prob_match else "Unknown"
-            break
+@metrics.timed("get_mesoscales")
+def get_mesoscales(latitude, longitude):
+    return mesoscales_at(fetch_mesoscale_discussions(), latitude, longitude)
+
+
+OUTLOOK_URLS = {
+    1: "https://www.spc.noaa.gov/products/outlook/day1otlk_cat.nolyr.geojson",
+    2: "https://www.spc.noaa.gov/products/outlook/day2otlk_cat.nolyr.geojson",
+    3: "https://www.spc.noaa.gov/products/outlook/day3otlk_cat.nolyr.geojson",
+}
+
+RISK_LIBRARY = {
+    2: ("Non-Severe T-Storms", 2),
+    3: ("Marginal Risk", 3),
+    4: ("Slight Risk", 4),
+    5: ("Enhanced", 5),
+    6: ("Moderate", 6),
+    8: ("High", 8)}
+
+
+@metrics.timed("parse_outlook")
+def parse_outlook(body):
+    """
+    Parses a categorical outlook GeoJSON into a spatial.OutlookIndex.
+    Features are streamed one at a time.
+    """
+    from shapely.geometry import shape
+    from spatial import OutlookIndex
+    from geojson_stream import iter_features
+
+    features = [
+        (feature["properties"].get("DN"), shape(feature.get("geometry")))
+        for feature in iter_features(body)
+    ]
+    return OutlookIndex(features)
+
+
+def load_outlook_index(day, body):
+    """
+    The full spatial.OutlookIndex of a downloaded outlook. Each issuance
+    is parsed once and its geometries kept in the geometry store, so
+    later runs skip the GeoJSON entirely.
+    """
+    from spatial import OutlookIndex, NO_RISK
+    from geometry_store import get_geometry_store, product_key
+
+    store = get_geometry_store()
+    key = product_key(f"day{day}", body)
+    saved = store.load(key)
+    if saved is not None:
+        geometries, dns = saved
+        return OutlookIndex(zip(dns, geometries))
+
+    index = parse_outlook(body)
+    store.save(key, index.geometries, [None if dn == NO_RISK else dn for dn in index.dn.tolist()])
+    return index
+
+
+def fetch_outlook(day):
+    """
+    Downloads a day 1-3 categorical outlook as a spatial.OutlookIndex,
+    reused until the product changes.
+    """
+    # Check if the provided day is valid
+    if day not in OUTLOOK_URLS:
+        raise ValueError("Invalid day. Supported values are 1, 2, or 3.")
 
-    if mesoscale_data["summary"] is None:
-        mesoscale_data["summary"] = "None"
-        mesoscale_data["probability"] = "0"
+    outlook_url = OUTLOOK_URLS[day]
+    body = http_client.get_cached_content(outlook_url, "outlook")
+    return _indexed_product(outlook_url, body, lambda b: load_outlook_index(day, b))
 
-    return mesoscale_data
 
+def outlook_version(day):
+    """
+    Body digest of the day's outlook as fetch_outlook last indexed it, or
+    None before the first fetch. Every issuance changes it, even one whose
+    categories at a given point didn't change.
+    """
+    cached = _product_indexes.get(OUTLOOK_URLS[day])
+    return cached[0] if cached is not None else None
 
-def get_max_risk(day, latitude, longitude):
-    risk_data = {
-        "description": None,
-        "risk_level": None
-    }
 
+def product_body(url):
+    """The body of url's product as last indexed in this process, or None."""
+    return _product_bodies.get(url)
 
-    outlook_urls = {
-        1: "https://www.spc.noaa.gov/products/outlook/day1otlk_cat.nolyr.geojson",
-        2: "https://www.spc.noaa.gov/products/outlook/day2otlk_cat.nolyr.geojson",
-        3: "https://www.spc.noaa.gov/products/outlook/day3otlk_cat.nolyr.geojson",
-    }
 
-    # Check if the provided day is valid
-    if day not in outlook_urls:
+def fetch_outlook_grid(day, body=None):
+    """
+    fetch_outlook for large fleets: a risk_grid.GriddedOutlook answering
+    from a raster built once per issuance (and kept on disk). Only points
+    on cells a polygon edge crosses are checked against the polygons.
+    Like fetch_mesoscale_grid, downloads nothing when given the body.
+    """
+    from risk_grid import GriddedOutlook, outlook_grid
+
+    if day not in OUTLOOK_URLS:
         raise ValueError("Invalid day. Supported values are 1, 2, or 3.")
 
-    # Retrieve the outlook URL for the given day
-    outlook_url = outlook_urls[day]
-
-    # Fetch and parse the outlook response
-    outlook_response = requests.get(outlook_url).json()
-    
-    max_dn = float('-inf')
-    risk_level_description = None
-    
-    risk_library = {
-        2: ("Non-Severe T-Storms", 2),
-        3: ("Marginal Risk", 3),
-        4: ("Slight Risk", 4),
-        5: ("Enhanced", 5),
-        6: ("Moderate", 6),
-        8: ("High", 8)}
-
-    for feature in outlook_response["features"]:
-        polygon = shape(feature["geometry"])
-        
-        # Check if the point is within the polygon
-        if polygon.contains(Point(longitude, latitude)):
-            dn = feature["properties"].get("DN")
-            if dn is not None and dn > max_dn:
-                max_dn = dn
-                risk_level_description = risk_library.get(max_dn)
+    outlook_url = OUTLOOK_URLS[day]
+    if body is None:
+        body = http_client.get_cached_content(outlook_url, "outlook")
+
+    def index():
+        return _indexed_product(outlook_url, body, lambda b: load_outlook_index(day, b))
+
+    grid = _indexed_product(f"{outlook_url}#grid", body, lambda b: outlook_grid(f"day{day}", b, index))
+    return GriddedOutlook(grid, lambda lons, lats: index())
+
+
+def risk_data_for(dn):
+    risk_data = {
+        "description": None,
+        "risk_level": None
+    }
 
+    risk_level_description = RISK_LIBRARY.get(dn)
     if risk_level_description:
         risk_data["description"], risk_data["risk_level"] = risk_level_description
 
     return risk_data
 
 
-from collections import defaultdict
-from datetime import datetime
-import requests
+def max_risk_at(outlook, latitude, longitude):
+    return risk_data_for(outlook.max_dn(longitude, latitude))
 
-def get_forecast(latitude, longitude):
-    forecast_data = {
-        "midnighthigh": {},
-        "rainalerts": {}
-    }
 
-    gridpoint_url = f"https://api.weather.gov/points/{latitude},{longitude}"
-    gridpoint_response = requests.get(gridpoint_url).json()
-    forecast_hourly_url = gridpoint_response["properties"]["forecastHourly"]
-    forecast_hourly_response = requests.get(forecast_hourly_url).json()
-
-    periods = forecast_hourly_response['properties']['periods']
-    periods_by_date = defaultdict(list)
-    for period in periods:
-        date = period['startTime'].split('T')[0]
-        periods_by_date[date].append(period)
-
-    sorted_dates = sorted(periods_by_date.keys())[:-1]
-
-    for date in sorted_dates:
-        daily_periods = periods_by_date[date]
-        max_temp_period = max(daily_periods, key=lambda p: p['temperature'])
-        max_temp = max_temp_period['temperature']
-        max_temp_hour = datetime.strptime(max_temp_period['startTime'], "%Y-%m-%dT%H:%M:%S%z").hour
-
-        # Find the temperature at 5pm (17:00) if available
-        temp_5pm = next((p['temperature'] for p in daily_periods if datetime.strptime(p['startTime'], "%Y-%m-%dT%H:%M:%S%z").hour == 17), None)
-
-        # Check if the highest temperature is before noon
-        if max_temp_hour < 12:
-            forecast_data["midnighthigh"][date] = {
-                "daily_high": max_temp,
-                "hour_of_daily_high": max_temp_hour,
-                "afternoon_high": temp_5pm
-            }
-
-
-    for period in periods:
-        # Convert startTime to datetime first
-        start_time = datetime.strptime(period['startTime'], "%Y-%m-%dT%H:%M:%S%z")
-        
-        # Only process future periods
-        if start_time > datetime.now(start_time.tzinfo):  # match timezone
-            start_date = start_time.date().isoformat()  # 'YYYY-MM-DD'
-            probability = period['probabilityOfPrecipitation']['value']
-
-            if probability > 30:
-                # Only add the first alert for each day
-                if start_date not in forecast_data["rainalerts"]:
-                    start_time_str = start_time.strftime("%A %m/%d at %I%p")
-                    forecast_data["rainalerts"][start_date] = {
-                        'start_time': start_time_str,
-                        'probability': probability
-                    }
-
-    return forecast_data
-
-#from flask import jsonify
-#from flask_caching import Cache  # If caching is needed
-import requests   
-import sys
-import feedparser
-import json
-import re
-from shapely.geometry import Point, shape, Polygon
-from collections import defaultdict
-from datetime import datetime
+def max_risk_many(outlook, latitudes, longitudes):
+    return [risk_data_for(int(dn)) for dn in outlook.max_dn_many(longitudes, latitudes)]
 
-debug = 0
 
-api_endpoint = "https://api.weather.gov"
-zip_code = "66226"
+def get_max_risk(day, latitude, longitude):
+    with metrics.stage(f"get_max_risk.day{day}"):
+        outlook = fetch_outlook(day)
+        return max_risk_at(outlook, latitude, longitude)
 
-if debug == 1:
-    print("forecast_hourly_url",forecast_hourly_url)
-    print(gridpoint_url)
 
-# Retrieve the forecastZone value
-if debug == 1:
-    forecast_zone = gridpoint_response["properties"]["forecastZone"]
-    forecast_office = gridpoint_response["properties"]["cwa"]
 
-    print("Forecast Zone:", forecast_zone)
-    print("Forecast Office:", forecast_office)
\ No newline at end of file
+def fetch_hourly_periods(latitude, longitude):
+    # /points is cached (see gridpoints.py), so normally this is one request
+    forecast_hourly_response = gridpoints.get_hourly_forecast(latitude, longitude)
+    return forecast_hourly_response['properties']['periods']
+
+
+@metrics.timed("forecast_columns")
+def forecasts_many(periods_by_location):
+    """forecast_data for many locations in one columnar pass (see forecast.py)."""
+    from forecast import HourlyColumns
+
+    return HourlyColumns.from_periods(periods_by_location).forecast_data()
+
+
+@metrics.timed("get_forecast")
+def get_forecast(latitude, longitude):
+    return forecasts_many([fetch_hourly_periods(latitude, longitude)])[0]
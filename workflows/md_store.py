@@ -0,0 +1,98 @@
+"""
+Incremental store of parsed SPC mesoscale discussions.
+
+Entries are keyed by the feed GUID (falling back to the MD number in the
+title). Only entries that haven't been seen before are run through the
+<pre>/coordinate parsing; the compact polygon, summary and watch
+probability are kept in .cache/mesoscales.json between runs, and entries
+are dropped as soon as they fall out of the feed.
+"""
+
+import os
+import re
+import threading
+import time
+
+import http_cache
+
+_MD_NUMBER = re.compile(r"\bMD\s*#?\s*(\d+)", re.IGNORECASE)
+
+
+def md_number(title):
+    match = _MD_NUMBER.search(title or "")
+    return match.group(1) if match else None
+
+
+class MesoscaleStore:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(http_cache.DEFAULT_DIR, "mesoscales.json")
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = http_cache.load_json(self.path, {})
+        return self._entries
+
+    def _save(self):
+        http_cache.write_json_atomic(self.path, self._entries)
+
+    def sync(self, items, parse):
+        """
+        Applies the current feed to the store.
+
+        items yields (guid, title, text) in feed order; parse turns an
+        entry's text into {"coords", "description", "summary",
+        "probability"} or None. Returns the active, parseable records in
+        feed order.
+        """
+        with self._lock:
+            entries = self._load()
+            changed = False
+            seen = []
+            for guid, title, text in items:
+                key = guid or md_number(title)
+                if not key:
+                    continue
+                seen.append(key)
+                if key in entries:
+                    continue
+                record = parse(text) or {"coords": None}
+                record["number"] = md_number(title)
+                record["first_seen"] = time.time()
+                entries[key] = record
+                changed = True
+
+            active = set(seen)
+            for key in [k for k in entries if k not in active]:
+                del entries[key]
+                changed = True
+
+            if changed:
+                self._save()
+
+            return [
+                dict(entries[key], guid=key)
+                for key in seen
+                if entries[key].get("coords")
+            ]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_md_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MesoscaleStore()
+    return _store
+
+
+def set_md_store(store):
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
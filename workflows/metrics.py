@@ -0,0 +1,148 @@
+"""
+Per-stage instrumentation for the weather pipeline.
+
+Wrap a stage in `with metrics.stage("get_watches"):` (or decorate it with
+@metrics.timed) to record its wall time. HTTP bytes and cache hit/miss
+events are attributed to the innermost stage running on the current
+thread. get_metrics() holds process-wide running totals: write_prometheus()
+dumps them after a cron run (--metrics) and the API server serves them at
+/metrics. A single run's numbers come from a collector:
+
+    with metrics.collect() as run:
+        ...
+    summary["metadata"]["timings"] = run.snapshot()
+
+which sees everything recorded in its context, including work handed to
+threads that copy the context (workflow.FetchPool does).
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+_collectors = contextvars.ContextVar("metrics_collectors", default=())
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {
+                "calls": 0, "seconds": 0.0, "bytes": 0,
+                "cache_hit": 0, "cache_miss": 0, "cache_revalidated": 0,
+            }
+        return stage
+
+    def add(self, name, **values):
+        with self._lock:
+            stage = self._stage(name)
+            for key, value in values.items():
+                stage[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: dict(values, seconds=round(values["seconds"], 4))
+                for name, values in self.stages.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+
+    def prometheus(self, prefix="grove"):
+        """The recorded stages in Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(metric, kind, help_text, rows):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            lines.extend(f"{prefix}_{metric}{{{labels}}} {value}" for labels, value in rows)
+
+        family("stage_seconds_total", "counter", "Wall time spent in each pipeline stage.",
+               [(f'stage="{n}"', v["seconds"]) for n, v in sorted(snapshot.items())])
+        family("stage_calls_total", "counter", "Times each pipeline stage ran.",
+               [(f'stage="{n}"', v["calls"]) for n, v in sorted(snapshot.items())])
+        family("stage_bytes_total", "counter", "Bytes downloaded while each stage ran.",
+               [(f'stage="{n}"', v["bytes"]) for n, v in sorted(snapshot.items())])
+        family("cache_requests_total", "counter", "Cache lookups by stage and result.",
+               [(f'stage="{n}",result="{r}"', v[f"cache_{r}"])
+                for n, v in sorted(snapshot.items())
+                for r in ("hit", "miss", "revalidated")
+                if v[f"cache_{r}"]])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        with open(path, "w") as f:
+            f.write(self.prometheus())
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+@contextmanager
+def collect():
+    """A fresh Metrics that also receives everything recorded in this context."""
+    collector = Metrics()
+    token = _collectors.set(_collectors.get() + (collector,))
+    try:
+        yield collector
+    finally:
+        _collectors.reset(token)
+
+
+def _add(name, **values):
+    _metrics.add(name, **values)
+    for collector in _collectors.get():
+        collector.add(name, **values)
+
+
+def current_stage():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else "other"
+
+
+@contextmanager
+def stage(name):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stack.pop()
+        _add(name, calls=1, seconds=time.perf_counter() - t0)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_bytes(count):
+    _add(current_stage(), bytes=count)
+
+
+def record_cache(result):
+    """result is "hit", "miss" or "revalidated"."""
+    _add(current_stage(), **{f"cache_{result}": 1})
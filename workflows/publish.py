@@ -0,0 +1,142 @@
+"""
+Change detection for the published outputs.
+
+The rendered JSON always differs from the last run because it embeds the
+current time, so it can't be compared directly. Instead the semantic
+payload (what the complications actually show: watches, SPC risks, rain,
+MD, midnight high and the 4-day grid) is hashed and compared with the
+hash recorded at the last publish. Outputs are only rendered and
+rewritten when that changed, or when PUBLISH_MAX_AGE has passed so the
+"updated" time on the watch doesn't go stale.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import http_cache
+from http_cache import write_json_atomic
+
+# Seconds after which unchanged outputs are republished anyway
+PUBLISH_MAX_AGE = int(os.getenv("GROVE_PUBLISH_MAX_AGE", 3600))
+
+
+def semantic_payload(simple):
+    """The parts of simplify_for_complication's output that reach the screen."""
+    watches = simple.get("watches") or {}
+    return {
+        "watches": {
+            event: watch.get("headline") if isinstance(watch, dict) else watch
+            for event, watch in watches.items()
+        },
+        "watch_name": simple.get("watch_name"),
+        "severity": simple.get("severity"),
+        "spc_day1_risk": simple.get("spc_day1_risk"),
+        "spc_day2_risk": simple.get("spc_day2_risk"),
+        "rain": [simple.get("max_rain_time"), simple.get("max_rain_probability"), simple.get("rain_emoji")],
+        "mesoscale": [simple.get("mesoscale_active"), simple.get("mesoscale_probability")],
+        "midnighthigh": simple.get("midnighthigh"),
+        "four_days_grid": simple.get("four_days_grid"),
+    }
+
+
+def payload_digest(simple):
+    payload = json.dumps(semantic_payload(simple), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PublishState:
+    """Digest and time of the last publish per output, in .cache/published.json."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(http_cache.DEFAULT_DIR, "published.json")
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = http_cache.load_json(self.path, {})
+        return self._entries
+
+    def due(self, key, digest, now=None, max_age=None):
+        """
+        Why key should be published now: "new" (never published),
+        "changed", "refresh" (older than max_age), or None to skip.
+        """
+        now = time.time() if now is None else now
+        max_age = PUBLISH_MAX_AGE if max_age is None else max_age
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None:
+            return "new"
+        if entry["digest"] != digest:
+            return "changed"
+        if now - entry["published_at"] >= max_age:
+            return "refresh"
+        return None
+
+    def record(self, key, digest, now=None, save=True):
+        """Notes that key was published; save=False defers the write to save()."""
+        with self._lock:
+            self._load()[key] = {"digest": digest, "published_at": time.time() if now is None else now}
+        if save:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            write_json_atomic(self.path, self._load())
+
+
+class BatchPublisher:
+    """
+    Writes <name>.json / <name>_modular.json into out_dir for the batch
+    locations that are due, recording them in one PublishState save at
+    close(). Only one process should write a directory (fanout.py funnels
+    every worker's results through the parent's publisher).
+    """
+
+    def __init__(self, out_dir, max_age=None, state=None):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.max_age = max_age
+        self.state = state or get_publish_state()
+        self.now = time.time()
+        self.written = 0
+
+    def _key(self, name):
+        return os.path.join(os.path.abspath(self.out_dir), name)
+
+    def due(self, name, digest):
+        return self.state.due(self._key(name), digest, self.now, self.max_age) is not None
+
+    def write(self, name, digest, complication_json, modular_json):
+        write_json_atomic(os.path.join(self.out_dir, f"{name}.json"), complication_json, indent=2)
+        write_json_atomic(os.path.join(self.out_dir, f"{name}_modular.json"), modular_json, indent=2)
+        self.state.record(self._key(name), digest, self.now, save=False)
+        self.written += 1
+
+    def close(self):
+        if self.written:
+            self.state.save()
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_publish_state():
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = PublishState()
+    return _state
+
+
+def set_publish_state(state):
+    global _state
+    with _state_lock:
+        previous, _state = _state, state
+    return previous
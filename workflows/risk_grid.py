@@ -0,0 +1,236 @@
+"""
+Rasterized SPC products for fleet-sized lookups.
+
+A RiskGrid covers CONUS with CELL-degree cells (about 5 km), one uint8
+per cell. Cells that lie wholly inside or outside every polygon hold the
+answer directly: the highest outlook DN (0 for none), or for MDs a small
+id into a table of covering-MD sets. Cells crossed by a polygon edge
+that could change the answer hold EXACT, as do points off the grid, and
+those points alone are resolved against the real polygons.
+
+Grids are built once per issuance (keyed by the product's body digest)
+and saved as .npy, so later processes memory-map them instead of parsing
+the GeoJSON or MD feed:
+
+    grid = outlook_grid("day1", body, lambda: parse_outlook(body))
+    dn = GriddedOutlook(grid, exact).max_dn_many(lons, lats)
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import shapely
+
+import http_cache
+from spatial import NO_RISK
+
+BOUNDS = (-126.0, 23.0, -66.0, 50.0)  # CONUS (min lon, min lat, max lon, max lat)
+CELL = 0.05
+COLUMNS = int(round((BOUNDS[2] - BOUNDS[0]) / CELL))
+ROWS = int(round((BOUNDS[3] - BOUNDS[1]) / CELL))
+EXACT = 255
+MAX_SETS = EXACT - 1   # distinct covering-MD sets a grid can label
+MAX_MASK_BITS = 64
+
+
+def _cells(geometry):
+    """Flat indexes of the grid cells inside geometry and of those its edge crosses."""
+    if not geometry.is_valid:
+        # Overlapping parts: a point in any part counts, as with the STRtree
+        geometry = shapely.union_all(shapely.make_valid(shapely.get_parts(geometry)))
+    minx, miny, maxx, maxy = geometry.bounds
+    c0 = max(int(np.floor((minx - BOUNDS[0]) / CELL)), 0)
+    c1 = min(int(np.floor((maxx - BOUNDS[0]) / CELL)), COLUMNS - 1)
+    r0 = max(int(np.floor((miny - BOUNDS[1]) / CELL)), 0)
+    r1 = min(int(np.floor((maxy - BOUNDS[1]) / CELL)), ROWS - 1)
+    if c0 > c1 or r0 > r1:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    rows, cols = np.mgrid[r0:r1 + 1, c0:c1 + 1]
+    x0 = BOUNDS[0] + cols.ravel() * CELL
+    y0 = BOUNDS[1] + rows.ravel() * CELL
+    flat = rows.ravel() * COLUMNS + cols.ravel()
+
+    boundary = geometry.boundary
+    shapely.prepare(boundary)
+    edge = shapely.intersects(boundary, shapely.box(x0, y0, x0 + CELL, y0 + CELL))
+    # A cell no edge touches is entirely inside or entirely outside
+    inside = ~edge & shapely.contains_xy(geometry, x0 + CELL / 2, y0 + CELL / 2)
+    return flat[inside], flat[edge]
+
+
+class RiskGrid:
+    def __init__(self, values, table=None):
+        self.values = values
+        self.table = table
+
+    @classmethod
+    def for_outlook(cls, index):
+        """Highest DN per cell from a spatial.OutlookIndex."""
+        highest = np.zeros(ROWS * COLUMNS, dtype=np.uint8)
+        edges = []
+        for dn, geometry in zip(index.dn.tolist(), index.geometries):
+            if dn == NO_RISK:
+                continue
+            inside, edge = _cells(geometry)
+            np.maximum.at(highest, inside, dn)
+            edges.append((dn, edge))
+        values = highest.copy()
+        for dn, edge in edges:
+            # Only an edge whose DN beats what the cell is surely inside matters
+            values[edge[highest[edge] < dn]] = EXACT
+        return cls(values.reshape(ROWS, COLUMNS))
+
+    @classmethod
+    def for_mesoscales(cls, index):
+        """Covering-MD set per cell from a spatial.MesoscaleIndex."""
+        masks = np.zeros(ROWS * COLUMNS, dtype=np.uint64)
+        exact = np.zeros(ROWS * COLUMNS, dtype=bool)
+        for i, geometry in enumerate(index.geometries):
+            inside, edge = _cells(geometry)
+            exact[edge] = True
+            if i < MAX_MASK_BITS:
+                masks[inside] |= np.uint64(1 << i)
+            else:
+                exact[inside] = True
+
+        labels, inverse = np.unique(masks, return_inverse=True)
+        table = [tuple(i for i in range(MAX_MASK_BITS) if int(mask) >> i & 1) for mask in labels]
+        # Label 0 is always the empty set (the mask for most of the grid)
+        if not len(labels) or labels[0] != 0:
+            table.insert(0, ())
+            inverse = inverse + 1
+        values = inverse.astype(np.intp)
+        values[values > MAX_SETS] = EXACT
+        values[exact] = EXACT
+        return cls(values.astype(np.uint8).reshape(ROWS, COLUMNS), table[:MAX_SETS + 1])
+
+    def lookup(self, lons, lats):
+        """Cell value for each point; EXACT off the grid."""
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        cols = np.floor((lons - BOUNDS[0]) / CELL).astype(np.intp)
+        rows = np.floor((lats - BOUNDS[1]) / CELL).astype(np.intp)
+        on_grid = (cols >= 0) & (cols < COLUMNS) & (rows >= 0) & (rows < ROWS)
+        result = np.full(len(lons), EXACT, dtype=np.uint8)
+        result[on_grid] = self.values[rows[on_grid], cols[on_grid]]
+        return result
+
+    def save(self, path):
+        """Saves values to path (.npy) and the MD set table, if any, next to it."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.table is not None:
+            http_cache.write_json_atomic(_table_path(path), self.table)
+        tmp = http_cache.temp_path(path) + ".npy"  # np.save appends .npy otherwise
+        np.save(tmp, np.asarray(self.values))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        values = np.load(path, mmap_mode="r")
+        try:
+            with open(_table_path(path)) as f:
+                table = [tuple(ids) for ids in json.load(f)]
+        except FileNotFoundError:
+            table = None
+        return cls(values, table)
+
+
+def _table_path(path):
+    return path[:-len(".npy")] + ".table.json"
+
+
+def _saved_grid(name, body, build, directory=None):
+    """
+    The RiskGrid for this issuance of product name: memory-mapped from
+    disk when a previous run (or the parent of a worker) built it, else
+    built with build() and saved. Grids of older issuances are removed.
+    """
+    directory = directory or os.path.join(http_cache.DEFAULT_DIR, "risk_grids")
+    digest = hashlib.sha1(body).hexdigest()
+    path = os.path.join(directory, f"{name}-{CELL}-{digest}.npy")
+    try:
+        return RiskGrid.load(path)
+    except (OSError, ValueError):
+        pass
+
+    grid = build()
+    grid.save(path)
+    for old in glob.glob(os.path.join(directory, f"{name}-*.npy")):
+        if old != path:
+            for stale in (old, _table_path(old)):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    return grid
+
+
+def outlook_grid(name, body, build_index, directory=None):
+    """The saved RiskGrid for outlook name ("day1") built from build_index()."""
+    return _saved_grid(name, body, lambda: RiskGrid.for_outlook(build_index()), directory)
+
+
+def mesoscale_grid(body, build_index, directory=None):
+    """The saved RiskGrid for an MD feed built from build_index()."""
+    return _saved_grid("mesoscales", body, lambda: RiskGrid.for_mesoscales(build_index()), directory)
+
+
+class GriddedOutlook:
+    """
+    spatial.OutlookIndex stand-in answering from a RiskGrid. exact(lons,
+    lats) returns an OutlookIndex valid for those points and is only
+    called for points on EXACT cells.
+    """
+
+    def __init__(self, grid, exact):
+        self.grid = grid
+        self.exact = exact
+
+    def max_dn_many(self, lons, lats):
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        values = self.grid.lookup(lons, lats)
+        result = values.astype(np.int16)
+        result[values == 0] = NO_RISK
+        edge = values == EXACT
+        if edge.any():
+            result[edge] = self.exact(lons[edge], lats[edge]).max_dn_many(lons[edge], lats[edge])
+        return result
+
+    def max_dn(self, lon, lat):
+        dn = int(self.max_dn_many([lon], [lat])[0])
+        return None if dn == NO_RISK else dn
+
+
+class GriddedMesoscales:
+    """spatial.MesoscaleIndex stand-in answering from a RiskGrid built for it."""
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+        self.discussions = index.discussions
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def covering_many(self, lons, lats):
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        values = self.grid.lookup(lons, lats)
+        covering = [list(self.grid.table[v]) if v != EXACT else None for v in values.tolist()]
+        edge = np.flatnonzero(values == EXACT)
+        if len(edge):
+            for i, found in zip(edge.tolist(), self.index.covering_many(lons[edge], lats[edge])):
+                covering[i] = found
+        return covering
+
+    def covering(self, lon, lat):
+        return [self.discussions[i] for i in self.covering_many([lon], [lat])[0]]
@@ -0,0 +1,305 @@
+"""
+Append-only archive of run summaries, in .cache/archive.sqlite.
+
+Every run's get_weather_summary result is kept so alert latency, outlook
+evolution and staleness can be looked at afterwards. Most products don't
+change between 15-minute runs, so each distinct product body (canonical
+JSON, zlib-compressed) is stored once in `products` and runs only point
+at it:
+
+    locations one small integer id per gridpoints.point_key
+    runs      one row per location, source and run: product, status,
+              elapsed and a headline level (risk_level, highest watch
+              severity, MD probability, highest rain chance) for aggregates
+    alerts    first and last run each alert id was seen at a location
+
+runs is clustered on (location, source, run_at), so a query like "max day
+1 risk per day at X this season" reads one contiguous range of rows:
+
+    archive = get_run_archive()
+    archive.daily_max("39.0221,-94.8478", "day1", since=season_start)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import http_cache
+
+CENTRAL = ZoneInfo("America/Chicago")
+SEVERITY_LEVEL = {"Extreme": 4, "Severe": 3, "Moderate": 2, "Minor": 1}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS runs (
+    location INTEGER NOT NULL REFERENCES locations(id),
+    source TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    local_date TEXT NOT NULL,
+    product_id INTEGER REFERENCES products(id),
+    status TEXT NOT NULL,
+    elapsed_ms INTEGER,
+    level INTEGER,
+    PRIMARY KEY (location, source, run_at)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alerts (
+    location INTEGER NOT NULL REFERENCES locations(id),
+    alert_id TEXT NOT NULL,
+    event TEXT,
+    severity TEXT,
+    onset TEXT,
+    expires TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (location, alert_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS alerts_first_seen ON alerts(location, first_seen);
+"""
+
+
+def _level(source, value):
+    """The one number per product that aggregate queries look at."""
+    if not isinstance(value, dict):
+        return None
+    if source.startswith("day"):
+        return value.get("risk_level")
+    if source == "watches":
+        return max((SEVERITY_LEVEL.get(w.get("severity"), 0) for w in value.values()), default=0)
+    if source == "mesoscales":
+        try:
+            return int(value.get("probability") or 0)
+        except (TypeError, ValueError):
+            return None
+    if source == "forecast":
+        rain = (value.get("rainalerts") or {}).values()
+        return max((r.get("probability") or 0 for r in rain), default=0)
+    return None
+
+
+def _encode(value):
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha1(canonical).digest(), zlib.compress(canonical, 6)
+
+
+SOURCES = ("watches", "mesoscales", "forecast", "day1", "day2", "day3")
+STATUSES = ("ok", "stale", "timeout", "failed")
+SUMMARY_SOURCES = {
+    "watches": "watches",
+    "mesoscales": "mesoscales",
+    "forecast": "forecast_data",
+}
+
+
+def summary_products(summary):
+    """{source: parsed result} as fetch_sources returned them."""
+    products = {source: summary.get(key) for source, key in SUMMARY_SOURCES.items()}
+    products.update(summary.get("risk") or {})
+    return products
+
+
+def encode_summary(summary):
+    """
+    The archive rows for one summary, hashed and compressed but not yet
+    written: (product rows, alert rows). record_many does this itself;
+    fanout.py calls it in worker processes and hands the parent the rows.
+    """
+    statuses = summary["metadata"].get("sources", {})
+    products = []
+    for source, value in summary_products(summary).items():
+        info = statuses.get(source, {})
+        status = info.get("status", "ok")
+        elapsed = info.get("elapsed")
+        elapsed_ms = round(elapsed * 1000) if elapsed is not None else None
+        if status not in ("ok", "stale"):
+            # value is only SOURCE_FALLBACKS' placeholder
+            products.append((source, status, elapsed_ms, None, None, None))
+        else:
+            products.append((source, status, elapsed_ms, _level(source, value), *_encode(value)))
+    alerts = [
+        (watch["id"], event, watch.get("severity"), watch.get("onset"), watch.get("expires"))
+        for event, watch in (summary.get("watches") or {}).items()
+        if isinstance(watch, dict) and watch.get("id")
+    ]
+    return products, alerts
+
+
+class RunArchive:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(http_cache.DEFAULT_DIR, "archive.sqlite")
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _location_id(self, db, location, create=False):
+        row = db.execute("SELECT id FROM locations WHERE key = ?", (location,)).fetchone()
+        if row:
+            return row[0]
+        if create:
+            return db.execute("INSERT INTO locations (key) VALUES (?)", (location,)).lastrowid
+        return None
+
+    def _product_id(self, db, digest, body):
+        row = db.execute("SELECT id FROM products WHERE digest = ?", (digest,)).fetchone()
+        if row:
+            return row[0]
+        return db.execute("INSERT INTO products (digest, body) VALUES (?, ?)", (digest, body)).lastrowid
+
+    def _record(self, db, location, encoded, run_at):
+        location_id = self._location_id(db, location, create=True)
+        local_date = datetime.fromtimestamp(run_at, CENTRAL).date().isoformat()
+        products, alerts = encoded
+        db.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            (location_id, source, run_at, local_date,
+             self._product_id(db, digest, body) if digest is not None else None,
+             status, elapsed_ms, level)
+            for source, status, elapsed_ms, level, digest, body in products
+        ])
+        db.executemany(
+            "INSERT INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (location, alert_id) DO UPDATE SET last_seen = excluded.last_seen",
+            [(location_id, *alert, run_at, run_at) for alert in alerts],
+        )
+
+    def record(self, location, summary, run_at=None):
+        """Archives one summary for location (gridpoints.point_key)."""
+        self.record_many({location: summary}, run_at)
+
+    def record_many(self, summaries, run_at=None):
+        """Archives {location: summary} in one transaction."""
+        self.record_encoded({location: encode_summary(summary) for location, summary in summaries.items()},
+                            run_at)
+
+    def record_encoded(self, encoded, run_at=None):
+        """record_many for {location: encode_summary(summary)}."""
+        run_at = time.time() if run_at is None else run_at
+        with self._lock:
+            db = self._connect()
+            with db:
+                for location, rows in encoded.items():
+                    self._record(db, location, rows, run_at)
+
+    def _query(self, sql, location, *args):
+        """Runs sql with location's id as the first parameter."""
+        with self._lock:
+            db = self._connect()
+            location_id = self._location_id(db, location)
+            if location_id is None:
+                return []
+            return db.execute(sql, (location_id, *args)).fetchall()
+
+    def daily_max(self, location, source, since=0, until=None):
+        """[(CT date, highest level)] for source at location, e.g. max day 1 risk per day."""
+        return self._query(
+            "SELECT local_date, MAX(level) FROM runs "
+            "WHERE location = ? AND source = ? AND run_at >= ? AND run_at < ? "
+            "GROUP BY local_date ORDER BY local_date",
+            location, source, since, until if until is not None else float("inf"),
+        )
+
+    def source_health(self, location, since=0, until=None):
+        """{source: {status: runs}} at location, e.g. how often day1 went stale."""
+        counts = ", ".join(f"SUM(status = '{status}')" for status in STATUSES)
+        rows = self._query(
+            f"SELECT source, {counts} FROM runs "
+            f"WHERE location = ? AND source IN ({', '.join('?' * len(SOURCES))}) "
+            f"AND run_at >= ? AND run_at < ? GROUP BY source",
+            location, *SOURCES, since, until if until is not None else float("inf"),
+        )
+        return {
+            source: {status: runs for status, runs in zip(STATUSES, counts) if runs}
+            for source, *counts in rows
+        }
+
+    def product_changes(self, location, source, since=0, until=None):
+        """
+        [(run_at, product)] for every run where source's product differed
+        from the previous run's, e.g. how a day 1 outlook evolved.
+        """
+        rows = self._query(
+            "SELECT run_at, product_id FROM runs "
+            "WHERE location = ? AND source = ? AND run_at >= ? AND run_at < ? AND product_id IS NOT NULL "
+            "ORDER BY run_at",
+            location, source, since, until if until is not None else float("inf"),
+        )
+        changes, previous = [], None
+        for run_at, product_id in rows:
+            if product_id != previous:
+                changes.append((run_at, product_id))
+                previous = product_id
+        return [(run_at, self.product(product_id)) for run_at, product_id in changes]
+
+    def product(self, product_id):
+        with self._lock:
+            row = self._connect().execute("SELECT body FROM products WHERE id = ?", (product_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def alert_latency(self, location, since=0):
+        """
+        [(event, alert id, onset, seconds from onset to first seen)] for
+        alerts first seen at location since since.
+        """
+        rows = self._query(
+            "SELECT event, alert_id, onset, first_seen FROM alerts "
+            "WHERE location = ? AND first_seen >= ? ORDER BY first_seen",
+            location, since,
+        )
+        latency = []
+        for event, alert_id, onset, first_seen in rows:
+            try:
+                started = datetime.fromisoformat(onset)
+            except (TypeError, ValueError):
+                started = None
+            if started is not None and started.tzinfo is None:
+                started = started.replace(tzinfo=timezone.utc)
+            latency.append((event, alert_id, onset,
+                            round(first_seen - started.timestamp(), 1) if started else None))
+        return latency
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_run_archive():
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = RunArchive()
+    return _archive
+
+
+def set_run_archive(archive):
+    global _archive
+    with _archive_lock:
+        previous, _archive = _archive, archive
+    return previous
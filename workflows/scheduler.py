@@ -0,0 +1,208 @@
+"""
+Refresh schedule for the long-running daemon (workflow.py --daemon).
+
+Alerts and MDs are polled on short fixed intervals. The SPC outlooks are
+only re-fetched around their issuance times: once an issuance has passed
+the outlook is checked every OUTLOOK_RETRY seconds until a new version
+shows up (or OUTLOOK_LATE_WINDOW runs out), then it sleeps until the next
+issuance.
+
+A failed refresh is retried after FAILURE_RETRY seconds, doubling with
+each consecutive failure up to FAILURE_BACKOFF_MAX.
+
+With an AdaptivePolicy the alert/MD/forecast intervals follow the current
+threat level instead: every minute or two while a watch, an MD or a high
+day 1 outlook is active, hourly when everything is quiet. Every refresh,
+outlook polls and failure retries included, stays inside a rolling
+request budget.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+# Seconds between polls for products that change minute to minute
+POLL_INTERVALS = {
+    "watches": 120,
+    "mesoscales": 120,
+    "forecast": 1800,
+}
+
+# SPC categorical outlook issuance times (UTC)
+OUTLOOK_ISSUANCES = {
+    "day1": ["01:00", "06:00", "13:00", "16:30", "20:00"],
+    "day2": ["06:00", "17:30"],
+    "day3": ["07:30", "19:30"],
+}
+ISSUANCE_GRACE = 300         # products land on the site a few minutes late
+OUTLOOK_RETRY = 300          # re-check cadence while waiting for a late issuance
+OUTLOOK_LATE_WINDOW = 3600   # give up waiting after this long
+FAILURE_RETRY = 60           # a failed refresh is first retried this soon
+FAILURE_BACKOFF_MAX = 3600   # consecutive failures back off up to this
+
+
+# Poll intervals (seconds) at each threat level, see threat_level()
+ADAPTIVE_INTERVALS = {
+    "active":   {"watches": 60,   "mesoscales": 120,  "forecast": 1800},
+    "elevated": {"watches": 600,  "mesoscales": 600,  "forecast": 1800},
+    "quiet":    {"watches": 3600, "mesoscales": 3600, "forecast": 3600},
+}
+ACTIVE_DAY1_RISK = 5         # Enhanced and above counts as a high outlook
+REQUEST_BUDGET = 1500        # upstream requests per rolling BUDGET_WINDOW
+BUDGET_WINDOW = 24 * 3600
+BUDGET_SLOWDOWN = 0.75       # past this share of the budget, poll half as often
+
+
+def threat_level(severity=None, mesoscale_active=False, day1_risk=None):
+    """
+    "active" for a Severe/Extreme watch, an MD covering the point or an
+    Enhanced+ day 1 outlook; "quiet" when every grid cell would be ⚫
+    (no watch, no MD, day 1 below non-severe t-storms); otherwise
+    "elevated".
+    """
+    try:
+        day1_risk = int(day1_risk or 0)
+    except (TypeError, ValueError):
+        day1_risk = 0
+
+    if severity in ("Severe", "Extreme") or mesoscale_active or day1_risk >= ACTIVE_DAY1_RISK:
+        return "active"
+    if severity in (None, "Unknown") and day1_risk < 2:
+        return "quiet"
+    return "elevated"
+
+
+class AdaptivePolicy:
+    def __init__(self, intervals=None, budget=REQUEST_BUDGET, window=BUDGET_WINDOW):
+        self.intervals = intervals or ADAPTIVE_INTERVALS
+        self.budget = budget
+        self.window = window
+        self.level = "elevated"  # until the first observation
+        self.requests = deque()
+
+    def observe(self, **state):
+        """Updates the threat level; returns True if it changed."""
+        level = threat_level(**state)
+        changed = level != self.level
+        self.level = level
+        return changed
+
+    def record_request(self, now, count=1):
+        for _ in range(count):
+            self.requests.append(now)
+
+    def used(self, now):
+        while self.requests and self.requests[0] <= now - self.window:
+            self.requests.popleft()
+        return len(self.requests)
+
+    def remaining(self, now):
+        return max(0, self.budget - self.used(now))
+
+    def throttle(self, delay, now):
+        """delay (seconds until the next request) stretched to fit the budget."""
+        used = self.used(now)
+        if used >= self.budget:
+            # Out of budget: wait until the oldest request leaves the window
+            return max(delay, self.requests[0] + self.window - now)
+        if used >= self.budget * BUDGET_SLOWDOWN:
+            return delay * 2
+        return delay
+
+    def interval(self, product, now):
+        return self.throttle(self.intervals[self.level][product], now)
+
+
+def issuance_times(product, around):
+    """Issuance epochs for product on the UTC days before, of and after around."""
+    day = datetime.fromtimestamp(around, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    times = []
+    for offset in (-1, 0, 1):
+        base = day + timedelta(days=offset)
+        for hhmm in OUTLOOK_ISSUANCES[product]:
+            hour, minute = map(int, hhmm.split(":"))
+            times.append((base + timedelta(hours=hour, minutes=minute)).timestamp() + ISSUANCE_GRACE)
+    return sorted(times)
+
+
+def last_issuance(product, now):
+    return max(t for t in issuance_times(product, now) if t <= now)
+
+
+def next_issuance(product, now):
+    return min(t for t in issuance_times(product, now) if t > now)
+
+
+class RefreshSchedule:
+    def __init__(self, intervals=None, policy=None):
+        self.intervals = dict(POLL_INTERVALS if intervals is None else intervals)
+        self.policy = policy
+        self.next_due = {}
+        self.last_changed = {}
+        self.last_refreshed = {}
+        self.failures = {}
+
+    @property
+    def products(self):
+        return list(self.intervals) + list(OUTLOOK_ISSUANCES)
+
+    def due(self, now):
+        due = sorted((p for p in self.products if self.next_due.get(p, 0) <= now),
+                     key=lambda p: self.next_due.get(p, 0))
+        if self.policy is not None:
+            # Never more refreshes than the budget has left
+            due = due[:self.policy.remaining(now)]
+        return due
+
+    def interval(self, product, now):
+        if self.policy is not None:
+            return self.policy.interval(product, now)
+        return self.intervals[product]
+
+    def throttle(self, delay, now):
+        if self.policy is not None:
+            return self.policy.throttle(delay, now)
+        return delay
+
+    def observe(self, **state):
+        """
+        Feeds the current conditions to the policy. On a level change the
+        polled products are rescheduled from their last refresh.
+        """
+        if self.policy is None or not self.policy.observe(**state):
+            return
+        now = max(self.last_refreshed.values(), default=0)
+        for product in self.intervals:
+            if product in self.last_refreshed:
+                self.next_due[product] = self.last_refreshed[product] + self.interval(product, now)
+
+    def mark_refreshed(self, product, now, ok=True, changed=False):
+        self.last_refreshed[product] = now
+        if self.policy is not None:
+            self.policy.record_request(now)
+        if changed:
+            self.last_changed[product] = now
+
+        if not ok:
+            failures = self.failures[product] = self.failures.get(product, 0) + 1
+            backoff = min(FAILURE_RETRY * 2 ** (failures - 1), FAILURE_BACKOFF_MAX)
+            self.next_due[product] = now + self.throttle(backoff, now)
+            return
+        self.failures.pop(product, None)
+
+        if product in OUTLOOK_ISSUANCES:
+            issued = last_issuance(product, now)
+            waiting = self.last_changed.get(product, 0) < issued
+            if waiting and now - issued < OUTLOOK_LATE_WINDOW:
+                self.next_due[product] = now + self.throttle(OUTLOOK_RETRY, now)
+            else:
+                self.next_due[product] = max(next_issuance(product, now), now + self.throttle(0, now))
+        else:
+            self.next_due[product] = now + self.interval(product, now)
+
+    def sleep_time(self, now):
+        if not self.next_due:
+            return 0
+        wait = min(self.next_due.get(p, 0) for p in self.products) - now
+        if self.policy is not None and not self.policy.remaining(now):
+            wait = max(wait, self.policy.throttle(0, now))
+        return max(0.0, wait)
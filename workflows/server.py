@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+HTTP API serving complication JSON for any lat/lon.
+
+    GET /complication?lat=39.02&lon=-94.85   -> build_complication_json
+    GET /modular?lat=39.02&lon=-94.85        -> build_modular_large_json
+    GET /summary?lat=39.02&lon=-94.85        -> get_weather_summary
+    GET /metrics                             -> per-stage timings (Prometheus)
+
+Rendered payloads are cached per rounded location for CACHE_TIMEOUT
+seconds, concurrent misses for the same location share one upstream
+fetch, and every response carries an ETag so watch clients can send
+If-None-Match and get a 304 back.
+
+    python workflows/server.py --port 8080
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+
+from flask import Flask, Response, request
+from flask_caching import Cache
+
+import metrics
+from last_good import get_last_good_store
+from workflow import (
+    get_weather_summary, simplify_for_complication,
+    build_complication_json, build_modular_large_json,
+)
+
+CACHE_TIMEOUT = 300   # seconds a rendered location is served from cache
+LOCATION_DECIMALS = 2  # ~1 km; nearby users share one cache entry
+
+app = Flask(__name__)
+cache = Cache(app, config={
+    "CACHE_TYPE": "SimpleCache",
+    "CACHE_DEFAULT_TIMEOUT": CACHE_TIMEOUT,
+    "CACHE_THRESHOLD": 10000,
+})
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event()}
+
+        if not leader:
+            call["done"].wait()
+            if "error" in call:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+flight = SingleFlight()
+
+
+def _encode(payload):
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return {"body": body, "etag": hashlib.sha1(body).hexdigest()}
+
+
+def render_location(lat, lon):
+    summary = get_weather_summary(lat, lon, last_good=get_last_good_store())
+    simple = simplify_for_complication(summary)
+    return {
+        "summary": _encode(summary),
+        "complication": _encode(build_complication_json(simple)),
+        "modular": _encode(build_modular_large_json(simple["four_days_grid"])),
+    }
+
+
+def rendered(lat, lon):
+    lat, lon = round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS)
+    key = f"loc:{lat},{lon}"
+    payloads = cache.get(key)
+    if payloads is None:
+        def fill():
+            # Another request may have filled it while we queued
+            cached = cache.get(key)
+            if cached is None:
+                cached = render_location(lat, lon)
+                cache.set(key, cached)
+            return cached
+        payloads = flight.do(key, fill)
+    return payloads
+
+
+def _location_args():
+    try:
+        lat = float(request.args["lat"])
+        lon = float(request.args["lon"])
+    except (KeyError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def _respond(kind):
+    location = _location_args()
+    if location is None:
+        return Response(
+            json.dumps({"error": "lat and lon query parameters are required"}),
+            status=400, mimetype="application/json",
+        )
+
+    payload = rendered(*location)[kind]
+    response = Response(payload["body"], mimetype="application/json")
+    response.set_etag(payload["etag"])
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_TIMEOUT
+    return response.make_conditional(request)
+
+
+@app.route("/complication")
+def complication():
+    return _respond("complication")
+
+
+@app.route("/modular")
+def modular():
+    return _respond("modular")
+
+
+@app.route("/summary")
+def summary():
+    return _respond("summary")
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.get_metrics().prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grove complication API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.port, threaded=True)
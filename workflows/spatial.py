@@ -0,0 +1,131 @@
+"""
+Spatial indexes for SPC outlook and mesoscale discussion polygons and
+NWS active alerts.
+
+Both indexes are built once per product (STRtree over prepared
+geometries) and answer point queries for a single lon/lat or for whole
+arrays of points at once, so batch runs don't loop over every feature
+for every location.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import shape
+
+NO_RISK = -1  # DN reported when no outlook polygon contains the point
+
+
+class OutlookIndex:
+    """Categorical outlook polygons keyed by their DN value."""
+
+    def __init__(self, features):
+        features = [(dn, geom) for dn, geom in features if geom is not None]
+        self.dn = np.array([NO_RISK if dn is None else dn for dn, _ in features], dtype=np.int16)
+        self.geometries = np.array([geom for _, geom in features], dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def max_dn_many(self, lons, lats):
+        """Highest DN containing each point, NO_RISK where none does."""
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        result = np.full(len(points), NO_RISK, dtype=np.int16)
+        if len(self.geometries):
+            point_idx, geom_idx = self.tree.query(points, predicate="within")
+            np.maximum.at(result, point_idx, self.dn[geom_idx])
+        return result
+
+    def max_dn(self, lon, lat):
+        dn = int(self.max_dn_many([lon], [lat])[0])
+        return None if dn == NO_RISK else dn
+
+
+class MesoscaleIndex:
+    """Active MD polygons; discussions keep the order they had in the feed."""
+
+    def __init__(self, discussions):
+        self.discussions = list(discussions)
+        self.geometries = np.array([md["polygon"] for md in self.discussions], dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+
+    def __len__(self):
+        return len(self.discussions)
+
+    def __iter__(self):
+        return iter(self.discussions)
+
+    def covering_many(self, lons, lats):
+        """For each point, the sorted feed positions of every MD covering it."""
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        covering = [[] for _ in range(len(points))]
+        if len(self.discussions):
+            point_idx, md_idx = self.tree.query(points, predicate="within")
+            for p, m in sorted(zip(point_idx.tolist(), md_idx.tolist())):
+                covering[p].append(m)
+        return covering
+
+    def covering(self, lon, lat):
+        """Every MD covering the point, in feed order."""
+        return [self.discussions[i] for i in self.covering_many([lon], [lat])[0]]
+
+
+def alert_zones(properties):
+    """UGC ids (e.g. "KSZ105", "KSC091") an alert was issued for."""
+    ugc = (properties.get("geocode") or {}).get("UGC")
+    if ugc:
+        return list(ugc)
+    return [url.rsplit("/", 1)[-1] for url in properties.get("affectedZones") or []]
+
+
+class AlertIndex:
+    """
+    Active alerts, matched to points the way /alerts?point= does: alerts
+    with a polygon (warnings) by point-in-polygon, zone-based alerts with
+    no geometry (most watches and advisories) by the UGC forecast zone,
+    county or fire zone the point lies in.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.by_zone = defaultdict(list)
+        geometries, positions = [], []
+        for i, feature in enumerate(self.features):
+            if feature.get("geometry"):
+                geometries.append(shape(feature["geometry"]))
+                positions.append(i)
+            else:
+                for zone in alert_zones(feature["properties"]):
+                    self.by_zone[zone].append(i)
+        self.positions = np.array(positions, dtype=np.intp)
+        self.geometries = np.array(geometries, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+
+    def __len__(self):
+        return len(self.features)
+
+    def matching_many(self, lons, lats, zones):
+        """
+        For each point and its zone ids, the sorted feed positions of every
+        alert that applies to it.
+        """
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        matched = [set() for _ in range(len(points))]
+        if len(self.geometries):
+            point_idx, geom_idx = self.tree.query(points, predicate="within")
+            for p, i in zip(point_idx.tolist(), self.positions[geom_idx].tolist()):
+                matched[p].add(i)
+        for p, point_zones in enumerate(zones):
+            for zone in point_zones:
+                matched[p].update(self.by_zone.get(zone, ()))
+        return [sorted(m) for m in matched]
+
+    def matching(self, lon, lat, zones=()):
+        """Every alert applying to the point, in feed order."""
+        return [self.features[i] for i in self.matching_many([lon], [lat], [zones])[0]]
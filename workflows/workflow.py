@@ -1,13 +1,33 @@
 #!/usr/bin/env python3
 
 import os
+import csv
 import json
+import time
+import argparse
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 import sys
 
-from main import get_watches, get_mesoscales, get_max_risk, get_forecast
+import http_client
+import metrics
+from alert_store import get_alert_store
+from gridpoints import resolve_gridpoint, save_gridpoints, zone_ids
+from http_cache import write_json_atomic
+from last_good import get_last_good_store
+from publish import BatchPublisher, get_publish_state, payload_digest
+from run_archive import get_run_archive
+from main import (
+    get_watches, get_mesoscales, get_max_risk, get_forecast, outlook_version, load_dependencies,
+    fetch_mesoscale_grid, mesoscales_many, fetch_outlook_grid, max_risk_many,
+    fetch_hourly_periods, forecasts_many, alert_area, fetch_alerts, watches_many,
+    drop_expired_watches,
+)
 
 load_dotenv("locations.env")
 
@@ -129,24 +149,244 @@ def build_2x2_emoji_grid(spc_risk, rain_emoji, severity, mesoscale_active, has_m
     }
 
 
-def get_weather_summary(lat, lon):
-    watches = get_watches(lat, lon)
-    top_watch = get_most_severe_watch(watches)
-    mesoscales = get_mesoscales(lat, lon)
-    forecast_data = get_forecast(lat, lon)
+# Per-source timeouts (seconds) and the overall deadline for one run.
+# A source that misses its timeout is reported as "timeout" and the run
+# carries on with the fallback value below.
+SOURCE_TIMEOUTS = {
+    "watches": 10,
+    "mesoscales": 15,
+    "forecast": 20,   # two chained calls: /points then forecastHourly
+    "day1": 15,
+    "day2": 15,
+    "day3": 15,
+}
+RUN_DEADLINE = 30
+OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))  # output.json / output_modular.json
+MAX_WORKERS = 6
+
+# Oldest saved result (seconds) a failed source may be served from, see
+# fetch_sources. Sources not listed use STALE_MAX_AGE_DEFAULT.
+STALE_MAX_AGE = {
+    "watches": 3600,
+    "mesoscales": 3600,
+    "forecast": 6 * 3600,
+    "day1": 6 * 3600,     # superseded within hours, and the day rolls over
+    "day2": 12 * 3600,
+    "day3": 12 * 3600,
+}
+STALE_MAX_AGE_DEFAULT = 3600
+# Applied to a saved result before it is served stale
+STALE_FILTERS = {
+    "watches": drop_expired_watches,
+}
+
+# What a source contributes to the summary when it fails or times out
+SOURCE_FALLBACKS = {
+    "watches": lambda: {},
+    "mesoscales": lambda: {"summary": "None", "description": None, "probability": "0", "discussions": []},
+    "forecast": lambda: {"midnighthigh": {}, "rainalerts": {}},
+    "day1": lambda: {"description": None, "risk_level": None},
+    "day2": lambda: {"description": None, "risk_level": None},
+    "day3": lambda: {"description": None, "risk_level": None},
+}
+
+
+class FetchPool:
+    """
+    A bounded pool of daemon threads with the submit/shutdown subset of
+    ThreadPoolExecutor. ThreadPoolExecutor joins its workers at
+    interpreter exit, so one hung request would hold a cron run open long
+    past RUN_DEADLINE; a FetchPool's stragglers are abandoned instead.
+    Each task runs in a copy of the submitter's context, so a
+    metrics.collect() around fetch_sources sees its fetches.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix="fetch"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+
+    def submit(self, func, *args):
+        future = Future()
+        context = contextvars.copy_context()
+        self._queue.put((future, context.run, (func, *args)))
+        if len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._work, daemon=True,
+                name=f"{self.thread_name_prefix}_{len(self._threads)}",
+            )
+            thread.start()
+            self._threads.append(thread)
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, cancel_futures=False):
+        """Lets queued work finish (or cancels it) without waiting for it."""
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+
+
+def fetch_sources(tasks, timeouts=None, deadline=RUN_DEADLINE, max_workers=MAX_WORKERS,
+                  last_good=None, scope="", retry=True):
+    """
+    Runs independent fetches in a bounded thread pool.
+
+    tasks maps a source name to (func, args). Each source gets its own
+    timeout (SOURCE_TIMEOUTS by default) and nothing waits past the overall
+    deadline. Returns (results, sources) where results only holds the
+    sources that produced a value and sources records status/elapsed for
+    every one.
+
+    With a last_good store (see last_good.py), successful results are saved
+    under scope + name. A source that times out or fails is served from
+    the store and marked "stale" with its age, unless it is older than
+    the source's STALE_MAX_AGE (expired watches are dropped from it first,
+    see STALE_FILTERS). The late fetch (or a retry after a failure, unless
+    retry is False) keeps running in the background and refreshes the
+    store when it finishes.
+
+    Fetches run on daemon threads (FetchPool), so nothing still in flight
+    keeps the process alive once its caller is done: a cron run exits by
+    the deadline and drops its late fetches, while the daemon and the API
+    server let them finish.
+    """
+    timeouts = SOURCE_TIMEOUTS if timeouts is None else timeouts
+    # Heavy imports happen here, once, not racing on the fetch threads
+    load_dependencies()
+    started = time.monotonic()
+    elapsed = {}
+
+    def timed(name, func, args):
+        t0 = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            elapsed[name] = round(time.monotonic() - t0, 3)
+
+    def remember(name):
+        def done(future):
+            if not future.cancelled() and future.exception() is None:
+                last_good.put(scope + name, future.result())
+        return done
+
+    executor = FetchPool(max_workers)
+    futures = {
+        name: executor.submit(timed, name, func, args)
+        for name, (func, args) in tasks.items()
+    }
+    if last_good is not None:
+        for name, future in futures.items():
+            future.add_done_callback(remember(name))
+
+    results = {}
+    sources = {}
+    for name, future in futures.items():
+        limit = min(timeouts.get(name, deadline), deadline)
+        remaining = max(0.0, started + limit - time.monotonic())
+        try:
+            results[name] = future.result(timeout=remaining)
+            sources[name] = {"status": "ok", "elapsed": elapsed.get(name)}
+        except FuturesTimeout:
+            sources[name] = {"status": "timeout", "elapsed": round(time.monotonic() - started, 3)}
+        except Exception as e:
+            sources[name] = {"status": "failed", "elapsed": elapsed.get(name), "error": repr(e)}
+            if last_good is not None and retry:
+                # Revalidate in the background for the next run
+                func, args = tasks[name]
+                executor.submit(timed, name, func, args).add_done_callback(remember(name))
+
+        if name not in results and last_good is not None:
+            saved = last_good.get(scope + name)
+            if saved is not None and saved[1] <= STALE_MAX_AGE.get(name, STALE_MAX_AGE_DEFAULT):
+                value, age = saved
+                results[name] = STALE_FILTERS[name](value) if name in STALE_FILTERS else value
+                sources[name]["reason"] = sources[name]["status"]
+                sources[name]["status"] = "stale"
+                sources[name]["age"] = round(age)
+
+    # Don't hold the run open for stragglers
+    executor.shutdown(cancel_futures=last_good is None)
+    return results, sources
+
+
+def source_tasks(lat, lon, alerts=None):
+    return {
+        "watches": (get_watches, (lat, lon, alerts)),
+        "mesoscales": (get_mesoscales, (lat, lon)),
+        "forecast": (get_forecast, (lat, lon)),
+        "day1": (get_max_risk, (1, lat, lon)),
+        "day2": (get_max_risk, (2, lat, lon)),
+        "day3": (get_max_risk, (3, lat, lon)),
+    }
+
+
+def get_weather_summary(lat, lon, deadline=RUN_DEADLINE, last_good=None, alerts=None):
+    """
+    Fetches every source for one point. Pass a last_good.LastGoodStore to
+    fall back to the previous result of any source that misses its
+    deadline (main() and the daemon do), and an alert_store.AlertStore to
+    track the point's alerts by id. metadata.timings holds this run's
+    per-stage timings and cache counters (see metrics.collect).
+    """
+    from gridpoints import point_key
+
+    with metrics.collect() as run:
+        results, sources = fetch_sources(
+            source_tasks(lat, lon, alerts), deadline=deadline,
+            last_good=last_good, scope=f"{point_key(lat, lon)}:",
+        )
+    save_gridpoints()
+    return build_summary(lat, lon, results, sources, run.snapshot())
+
 
+def build_summary(lat, lon, results, sources, timings=None):
+    for name, fallback in SOURCE_FALLBACKS.items():
+        if name not in results:
+            results[name] = fallback()
+
+    watches = results["watches"]
+    top_watch = get_most_severe_watch(watches)
+    mesoscales = results["mesoscales"]
+    forecast_data = results["forecast"]
 
     risk = {
-        "day1": get_max_risk(1, lat, lon),
-        "day2": get_max_risk(2, lat, lon),
-        "day3": get_max_risk(3, lat, lon)
+        "day1": results["day1"],
+        "day2": results["day2"],
+        "day3": results["day3"]
     }
 
     return {
         "metadata": {
             "latitude": lat,
             "longitude": lon,
-            "updated": datetime.now(timezone.utc).isoformat()
+            "updated": datetime.now(timezone.utc).isoformat(),
+            "sources": sources,
+            "stale": sorted(name for name, info in sources.items() if info["status"] == "stale"),
+            # Only for single-location runs; batch locations share one run
+            "timings": timings or {},
         },
         "watches": watches,
         "most_severe_watch": top_watch,
@@ -155,6 +395,187 @@ def get_weather_summary(lat, lon):
         "risk": risk
     }
 
+# Batch mode: national products and area alerts are fetched once and
+# shared by every location; only the hourly forecast is per point.
+BATCH_DEADLINE = 300
+BATCH_WORKERS = 8
+
+def load_locations(path):
+    """
+    Reads a CSV with name,latitude,longitude columns. Names key the
+    results and become output file names, so they must be unique plain
+    file names (no path separators, not "." or "..").
+    """
+    locations, seen = [], set()
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            name = row["name"].strip()
+            if name in ("", ".", "..") or "/" in name or "\\" in name or "\0" in name:
+                raise ValueError(f"{path}:{reader.line_num}: {name!r} is not a valid location name")
+            if name in seen:
+                raise ValueError(f"{path}:{reader.line_num}: duplicate location name {name!r}")
+            seen.add(name)
+            locations.append({
+                "name": name,
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+            })
+    return locations
+
+
+def fetch_national(locations, deadline=BATCH_DEADLINE, max_workers=BATCH_WORKERS):
+    """
+    First half of get_weather_summaries: downloads each national SPC
+    product, and the active alerts for the locations' area, once.
+
+    Returns (national, national_sources, alerts): the fetched outlook and
+    MD products with their source statuses, and {name: (watches or None,
+    watches source status)} for every location.
+    """
+    lats = [loc["latitude"] for loc in locations]
+    lons = [loc["longitude"] for loc in locations]
+
+    # Gridpoints (cached on disk) give each location's UGC zones, so active
+    # alerts for the whole area come down in one request
+    resolved, gridpoint_sources = fetch_sources(
+        {loc["name"]: (resolve_gridpoint, (loc["latitude"], loc["longitude"])) for loc in locations},
+        timeouts={}, deadline=deadline, max_workers=max_workers)
+    save_gridpoints()
+    zones = [zone_ids(resolved[loc["name"]]) if loc["name"] in resolved else [] for loc in locations]
+    area = alert_area(zone for point_zones in zones for zone in point_zones)
+
+    # Outlooks and MDs are rasterized once per issuance (see risk_grid.py)
+    national, national_sources = fetch_sources({
+        "watches": (fetch_alerts, (area,)),
+        "mesoscales": (fetch_mesoscale_grid, ()),
+        "day1": (fetch_outlook_grid, (1,)),
+        "day2": (fetch_outlook_grid, (2,)),
+        "day3": (fetch_outlook_grid, (3,)),
+    }, timeouts={}, deadline=deadline, max_workers=max_workers)
+
+    # Alerts are matched here, where every point's zones are known
+    matched = watches_many(national.pop("watches"), lats, lons, zones) if "watches" in national else None
+    alerts = {}
+    for i, loc in enumerate(locations):
+        if loc["name"] not in resolved:
+            # Without its zones only polygon alerts could be matched
+            alerts[loc["name"]] = (None, gridpoint_sources[loc["name"]])
+        else:
+            alerts[loc["name"]] = (matched[i] if matched is not None else None, national_sources["watches"])
+    return national, national_sources, alerts
+
+
+def summarize_locations(locations, national, national_sources, alerts,
+                        deadline=BATCH_DEADLINE, max_workers=BATCH_WORKERS):
+    """
+    Second half of get_weather_summaries, for any subset of the locations
+    (fanout.py runs it per chunk in worker processes): fetches each hourly
+    forecast, evaluates the national products and builds {name: summary}.
+    """
+    lats = [loc["latitude"] for loc in locations]
+    lons = [loc["longitude"] for loc in locations]
+
+    tasks = {}
+    for loc in locations:
+        tasks[(loc["name"], "forecast")] = (fetch_hourly_periods, (loc["latitude"], loc["longitude"]))
+    per_location, location_sources = fetch_sources(
+        tasks, timeouts={}, deadline=deadline, max_workers=max_workers)
+    # Only re-resolved (moved) grids get here; fetch_national saved the rest
+    save_gridpoints()
+
+    # Evaluate every point against each national product in one vectorized step
+    evaluated = {}
+    if "mesoscales" in national:
+        evaluated["mesoscales"] = mesoscales_many(national["mesoscales"], lats, lons)
+    for day in ("day1", "day2", "day3"):
+        if day in national:
+            evaluated[day] = max_risk_many(national[day], lats, lons)
+
+    # Hourly forecasts for every location are reduced in one columnar pass
+    fetched = [loc for loc in locations if (loc["name"], "forecast") in per_location]
+    forecasts = forecasts_many([per_location[(loc["name"], "forecast")] for loc in fetched])
+    for loc, forecast_data in zip(fetched, forecasts):
+        per_location[(loc["name"], "forecast")] = forecast_data
+
+    summaries = {}
+    for i, loc in enumerate(locations):
+        name, lat, lon = loc["name"], loc["latitude"], loc["longitude"]
+        results = {source: values[i] for source, values in evaluated.items()}
+        sources = dict(national_sources)
+        sources["forecast"] = location_sources[(name, "forecast")]
+        if (name, "forecast") in per_location:
+            results["forecast"] = per_location[(name, "forecast")]
+        watches, sources["watches"] = alerts[name]
+        if watches is not None:
+            results["watches"] = watches
+        summaries[name] = build_summary(lat, lon, results, sources)
+    return summaries
+
+
+def get_weather_summaries(locations, deadline=BATCH_DEADLINE, max_workers=BATCH_WORKERS):
+    """
+    Builds a summary for every location while downloading each national
+    SPC product, and the active alerts for their area, once. Returns
+    {name: summary} in the same shape as get_weather_summary.
+    """
+    national, national_sources, alerts = fetch_national(locations, deadline, max_workers)
+    return summarize_locations(locations, national, national_sources, alerts, deadline, max_workers)
+
+
+def write_batch_outputs(summaries, out_dir, max_age=None):
+    """
+    Renders and writes <name>.json / <name>_modular.json for every location
+    whose content changed since it was last written (see publish.py).
+    Returns how many locations were written.
+    """
+    publisher = BatchPublisher(out_dir, max_age)
+    for name, summary in summaries.items():
+        simple = simplify_for_complication(summary)
+        digest = payload_digest(simple)
+        if publisher.due(name, digest):
+            publisher.write(name, digest, build_complication_json(simple),
+                            build_modular_large_json(simple["four_days_grid"]))
+    publisher.close()
+    return publisher.written
+
+
+def archive_summaries(summaries):
+    """Adds summaries to the run archive (run_archive.py); never fails the run."""
+    from gridpoints import point_key
+
+    try:
+        get_run_archive().record_many({
+            point_key(summary["metadata"]["latitude"], summary["metadata"]["longitude"]): summary
+            for summary in summaries
+        })
+    except Exception as e:
+        print(f"⚠️ Could not archive run: {e!r}")
+
+
+def archive_encoded(encoded, run_at=None):
+    """archive_summaries for {location: run_archive.encode_summary(summary)}."""
+    try:
+        get_run_archive().record_encoded(encoded, run_at)
+    except Exception as e:
+        print(f"⚠️ Could not archive run: {e!r}")
+
+
+def main_batch(locations_path, out_dir, max_age=None, processes=None):
+    """Batch run; with processes > 1 the per-location work is fanned out (see fanout.py)."""
+    locations = load_locations(locations_path)
+    started = time.monotonic()
+    if processes and processes > 1:
+        from fanout import run_batch
+        written = run_batch(locations, out_dir, processes, max_age=max_age)
+    else:
+        summaries = get_weather_summaries(locations)
+        archive_summaries(summaries.values())
+        written = write_batch_outputs(summaries, out_dir, max_age=max_age)
+    print(f"✅ {written}/{len(locations)} locations written to {os.path.abspath(out_dir)} "
+          f"in {time.monotonic() - started:.1f}s")
+
+
 def get_most_severe_watch(watches):
     most_severe_name = None
     highest_rank = -1
@@ -169,6 +590,7 @@ def get_most_severe_watch(watches):
 def get_emoji_by_severity(severity):
     return SEVERITY_EMOJI.get(severity, "No")
 
+@metrics.timed("simplify_for_complication")
 def simplify_for_complication(data):
     watches = data.get("watches", {})
     mesoscales = data.get("mesoscales", {})
@@ -261,6 +683,7 @@ def simplify_for_complication(data):
 
 
 
+@metrics.timed("build_modular_large_json")
 def build_modular_large_json(four_days_grid):
     header = "  ".join(d["day_abbr"] for d in four_days_grid)
     body1 = "  ".join(f"{d['spc_emoji']}{d['rain_emoji']}" for d in four_days_grid)
@@ -292,6 +715,7 @@ def build_modular_large_json(four_days_grid):
     }
 
 
+@metrics.timed("build_complication_json")
 def build_complication_json(data):
     watches = data.get("watches", {})
     watch_name = data.get("watch_name", None)
@@ -366,39 +790,272 @@ def build_complication_json(data):
     }
 
 
-def main():
+def location_from_env():
     latitude = os.getenv("LATITUDE")
     longitude = os.getenv("LONGITUDE")
     if not latitude or not longitude:
         raise Exception("LATITUDE and LONGITUDE environment variables must be set.")
 
-    latitude = float(latitude)
-    longitude = float(longitude)
+    return float(latitude), float(longitude)
 
-    summary = get_weather_summary(latitude, longitude)
-    print("Full detailed JSON:")
-    print(json.dumps(summary, indent=2))
 
-    simple = simplify_for_complication(summary)
-    print("\nSimplified data:")
-    print(json.dumps(simple, indent=2))
+def write_outputs(complication_json, modular_json, quiet=False):
+    output_path = os.path.join(OUTPUT_DIR, 'output.json')
+    if not quiet:
+        print(f"Writing to: {os.path.abspath(output_path)}")
+
+    write_json_atomic(output_path, complication_json, indent=2)
+    if not quiet:
+        print("✅ output.json updated at", datetime.now())
+
+    modular_path = os.path.join(OUTPUT_DIR, 'output_modular.json')
+    write_json_atomic(modular_path, modular_json, indent=2)
+    if not quiet:
+        print("✅ output_modular.json updated at", datetime.now())
+
+
+def publish_outputs(simple, max_age=None, quiet=False):
+    """
+    Renders and writes output.json / output_modular.json, but only when
+    what they show changed since the last publish or that publish is older
+    than max_age. Returns why it published ("new", "changed", "refresh"),
+    or None when the outputs were left alone.
+    """
+    published = get_publish_state()
+    digest = payload_digest(simple)
+    reason = published.due("output", digest, max_age=max_age)
+    if reason is None:
+        if not quiet:
+            print("\n⏭️ Outputs unchanged since last publish, not rewritten")
+        return None
 
     complication_json = build_complication_json(simple)
-    print("\nComplication JSON:")
-    print(json.dumps(complication_json, indent=2))
+    if not quiet:
+        print("\nComplication JSON:")
+        print(json.dumps(complication_json, indent=2))
+    write_outputs(complication_json, build_modular_large_json(simple["four_days_grid"]), quiet=quiet)
+    published.record("output", digest)
+    return reason
 
-    output_path = os.path.join(os.path.dirname(__file__), 'output.json')
-    print(f"Writing to: {os.path.abspath(output_path)}")
 
-    with open(output_path, "w") as f:
-        json.dump(complication_json, f, indent=2)
-        print("✅ output.json updated at", datetime.now())
+METRICS_PATH = os.path.join(os.path.dirname(__file__), "metrics.prom")
+
+
+def profiled(func, directory):
+    """
+    Runs func under cProfile and tracemalloc, leaving run.pstats,
+    run.tracemalloc and a top-allocations summary in directory.
+    """
+    import cProfile
+    import tracemalloc
+
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start(25)
+    try:
+        return profiler.runcall(func)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        profiler.dump_stats(os.path.join(directory, "run.pstats"))
+        snapshot.dump(os.path.join(directory, "run.tracemalloc"))
+        with open(os.path.join(directory, "top_allocations.txt"), "w") as f:
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        print(f"🔬 profile written to {os.path.abspath(directory)}")
+
+
+ALERT_EVENT_EMOJI = {"new": "🆕", "updated": "✏️", "expired": "⌛"}
+
+
+def print_alert_event(event):
+    alert = event["alert"]
+    print(f"{ALERT_EVENT_EMOJI[event['type']]} {event['type']} {alert['event']}: {alert['headline']}")
+
+
+def main(metrics_path=METRICS_PATH, quiet=False, max_age=None):
+    """
+    One cron run for the location in locations.env. quiet skips the
+    pretty-printed dumps of every stage and prints one compact status
+    line instead. Outputs are only rewritten when publish_outputs says so.
+    """
+    metrics.get_metrics().reset()
+    latitude, longitude = location_from_env()
+
+    alerts = get_alert_store()
+    if not quiet:
+        alerts.subscribe(print_alert_event)
+    summary = get_weather_summary(latitude, longitude, last_good=get_last_good_store(), alerts=alerts)
+    archive_summaries([summary])
+    if not quiet:
+        print("Full detailed JSON:")
+        print(json.dumps(summary, indent=2))
+
+    simple = simplify_for_complication(summary)
+    if not quiet:
+        print("\nSimplified data:")
+        print(json.dumps(simple, indent=2))
+
+    published = publish_outputs(simple, max_age=max_age, quiet=quiet)
+
+    if quiet:
+        print(json.dumps({
+            "updated": summary["metadata"]["updated"],
+            "published": published,
+            "severity": simple["severity"] if simple["has_watch"] else None,
+            "sources": {name: info["status"] for name, info in summary["metadata"]["sources"].items()},
+        }, separators=(",", ":")))
+
+    if metrics_path:
+        metrics.get_metrics().write_prometheus(metrics_path)
+
+
+def run_daemon(lat, lon, schedule=None, max_cycles=None, max_age=None):
+    """
+    Keeps the latest result of every source in memory and refreshes each
+    one on its own schedule (see scheduler.py). Outputs are re-rendered
+    only when a refreshed source actually changed (for watches, when the
+    alert store saw a new, updated or expired alert) and that changed what
+    the complications show, or when they are older than max_age. An
+    outlook counts as refreshed for the schedule once a new issuance was
+    downloaded, whether or not the point's category changed.
+    """
+    import hashlib
+    import http_cache
+    from gridpoints import point_key
+    from scheduler import RefreshSchedule, AdaptivePolicy
+
+    # The schedule decides when to refetch, so every refresh revalidates
+    for source in http_cache.CACHE_TTLS:
+        http_cache.CACHE_TTLS[source] = 0
+
+    schedule = schedule or RefreshSchedule(policy=AdaptivePolicy())
+    alerts = get_alert_store()
+    alerts.subscribe(print_alert_event)
+    scope = point_key(lat, lon)
+    tasks = source_tasks(lat, lon, alerts)
+    state, sources, digests, versions = {}, {}, {}, {}
+    simple = None
+    cycles = 0
+
+    while max_cycles is None or cycles < max_cycles:
+        now = time.time()
+        due = schedule.due(now)
+        if due:
+            with metrics.collect() as cycle:
+                results, statuses = fetch_sources(
+                    {name: tasks[name] for name in due},
+                    last_good=get_last_good_store(), scope=f"{scope}:",
+                    retry=False,  # the schedule retries failures within its budget
+                )
+            save_gridpoints()
+            changed = []
+            for name in due:
+                sources[name] = statuses[name]
+                ok = statuses[name]["status"] == "ok"
+                product_changed = False
+                if name in results:
+                    if name == "watches":
+                        digest = alerts.revision(scope)
+                    else:
+                        digest = hashlib.sha1(
+                            json.dumps(results[name], sort_keys=True, default=str).encode()
+                        ).hexdigest()
+                    product_changed = digests.get(name) != digest
+                    if product_changed:
+                        digests[name] = digest
+                        state[name] = results[name]
+                        changed.append(name)
+                if ok and name.startswith("day"):
+                    # A new issuance ends the late-issuance polling even when
+                    # this point's category stayed the same
+                    version = outlook_version(int(name[3:]))
+                    product_changed = versions.get(name) != version
+                    versions[name] = version
+                schedule.mark_refreshed(name, now, ok=ok, changed=product_changed)
+
+            if changed:
+                print(f"🔄 {datetime.now():%H:%M:%S} changed: {', '.join(changed)}")
+                summary = build_summary(lat, lon, dict(state), dict(sources), cycle.snapshot())
+                archive_summaries([summary])
+                simple = simplify_for_complication(summary)
+                schedule.observe(
+                    severity=simple["severity"] if simple["has_watch"] else None,
+                    mesoscale_active=simple["mesoscale_active"],
+                    day1_risk=(simple["spc_day1_risk"] or {}).get("risk_level"),
+                )
+            if simple is not None:
+                # Also republishes unchanged outputs once they pass max_age
+                publish_outputs(simple, max_age=max_age, quiet=True)
+            cycles += 1
+
+        time.sleep(schedule.sleep_time(time.time()))
 
-    modular_json = build_modular_large_json(simple["four_days_grid"])
-    modular_path = os.path.join(os.path.dirname(__file__), 'output_modular.json')
-    with open(modular_path, "w") as f:
-        json.dump(modular_json, f, indent=2)
-        print("✅ output_modular.json updated at", datetime.now())
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Grove weather complication builder")
+    parser.add_argument("--batch", metavar="LOCATIONS_CSV",
+                        help="CSV of name,latitude,longitude to build outputs for")
+    parser.add_argument("--out-dir",
+                        help="where batch outputs are written (default: outputs/ next to this script)")
+    parser.add_argument("--processes", type=int, default=None, metavar="N",
+                        help="fan batch locations out over N processes (0: one per CPU)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and refresh each source on its own schedule")
+    parser.add_argument("--metrics-file", default=METRICS_PATH,
+                        help="Prometheus text file with per-stage timings ('' to skip)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="print one compact status line instead of every stage's JSON")
+    parser.add_argument("--max-age", type=int, default=None, metavar="SECONDS",
+                        help="republish unchanged outputs after this long "
+                             "(default $GROVE_PUBLISH_MAX_AGE or 3600)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="capture a cProfile + tracemalloc snapshot of the run into DIR")
+    parser.add_argument("--record", metavar="ARCHIVE",
+                        help="save every upstream response into ARCHIVE")
+    parser.add_argument("--replay", metavar="ARCHIVE",
+                        help="serve upstream responses from ARCHIVE instead of the network; "
+                             "caches and outputs go to a scratch directory")
+    parser.add_argument("--replay-latency", type=float, default=0.0,
+                        help="seconds added to each replayed response")
+    parser.add_argument("--replay-error-rate", type=float, default=0.0,
+                        help="fraction of replayed requests that fail (503 or timeout)")
+    args = parser.parse_args()
+    if args.processes is not None and (args.record or args.replay):
+        parser.error("--processes can't be combined with --record or --replay")
+    if args.processes == 0:
+        args.processes = os.cpu_count()
+
+    if args.record or args.replay:
+        from http_archive import HttpArchive, RecordingClient, ReplayClient
+    if args.record:
+        http_client.set_client(RecordingClient(HttpArchive(args.record)))
+    elif args.replay:
+        http_client.set_client(ReplayClient(HttpArchive.load(args.replay),
+                                            latency=args.replay_latency,
+                                            error_rate=args.replay_error_rate))
+        # Leave the live caches, stores, archive and outputs alone
+        import tempfile
+        import http_cache
+        OUTPUT_DIR = tempfile.mkdtemp(prefix="grove-replay-")
+        http_cache.DEFAULT_DIR = os.path.join(OUTPUT_DIR, ".cache")
+        if args.metrics_file == METRICS_PATH:
+            args.metrics_file = os.path.join(OUTPUT_DIR, "metrics.prom")
+        print(f"🗂️ Replay caches and outputs go to {OUTPUT_DIR}")
+    args.out_dir = args.out_dir or os.path.join(OUTPUT_DIR, "outputs")
+
+    if args.batch:
+        run = lambda: main_batch(args.batch, args.out_dir, max_age=args.max_age, processes=args.processes)
+    elif args.daemon:
+        run = lambda: run_daemon(*location_from_env(), max_age=args.max_age)
+    else:
+        run = lambda: main(args.metrics_file, quiet=args.quiet, max_age=args.max_age)
+
+    try:
+        if args.profile:
+            profiled(run, args.profile)
+        else:
+            run()
+    finally:
+        if args.record:
+            http_client.get_client().close()